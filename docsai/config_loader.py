@@ -1,5 +1,12 @@
+import copy
+import os
 import yaml
+from functools import lru_cache
 from pathlib import Path
+from types import MappingProxyType
+
+# Prefer the libyaml C loader when PyYAML was built against it
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
 _DEFAULTS = {
     "retrieval": {"k_bm25": 40, "k_embed": 40, "combine_top_k": 10},
@@ -13,9 +20,17 @@ _DEFAULTS = {
 
 def load_config(profile: str):
     cfg_path = Path("profiles") / profile / "config.yaml"
-    if not cfg_path.exists():
-        raise FileNotFoundError(f"No config found for profile {profile}")
-    cfg = yaml.safe_load(cfg_path.read_text())
+    try:
+        st = os.stat(cfg_path)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"No config found for profile {profile}") from None
+    # Callers are free to mutate what they get back, so never hand out the cached dict
+    return copy.deepcopy(_load_cached(str(cfg_path), st.st_mtime_ns, st.st_size))
+
+@lru_cache(maxsize=32)
+def _load_cached(path: str, mtime_ns: int, size: int):
+    """Parse + merge a config file; (mtime_ns, size) only serve as the cache key."""
+    cfg = yaml.load(Path(path).read_text(), Loader=_YamlLoader)
     return _merge(_DEFAULTS, cfg)
 
 def _merge(a, b):
@@ -27,11 +42,19 @@ def _merge(a, b):
             out[k] = v
     return out
 
+@lru_cache(maxsize=16)
 def profile_paths(profile: str):
+    """
+    Resolve (and create on first use) a profile's directories.
+
+    Memoized per profile, so the mkdirs only run once; call
+    ``profile_paths.cache_clear()`` after deleting a profile directory.
+    The returned mapping is read-only because it is shared between callers.
+    """
     base = Path("profiles") / profile
     data = base / "data"
     chroma = data / "chroma"
     cache = base / "cache"
     cache.mkdir(parents=True, exist_ok=True)
     chroma.mkdir(parents=True, exist_ok=True)
-    return {"base": base, "data": data, "chroma": chroma, "cache": cache}
+    return MappingProxyType({"base": base, "data": data, "chroma": chroma, "cache": cache})
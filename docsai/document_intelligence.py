@@ -3,12 +3,88 @@ Document Intelligence System
 Intelligently categorizes, organizes, and prepares documents for optimal AI understanding.
 """
 
+import os
 import re
+from bisect import bisect_left
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
-from datetime import datetime
 from typing import Dict, List, Tuple, Optional, Any
 import hashlib
-import json
+import orjson
+
+
+def _first_matches(pattern: re.Pattern, text: str, limit: int) -> List[str]:
+    """Same values as ``pattern.findall(text)[:limit]`` but stops scanning after ``limit`` hits."""
+    group = 1 if pattern.groups else 0
+    return [m.group(group) for m in islice(pattern.finditer(text), limit)]
+
+
+@lru_cache(maxsize=32)
+def _window_block_re(step: int, chunk_size: int) -> re.Pattern:
+    """
+    Pattern matching ``step`` consecutive words at a time, specialised for one
+    (chunk_size, overlap) pair. Group 1 ends after the first ``chunk_size % step``
+    words of the block, which is where a window that started ``chunk_size // step``
+    blocks earlier stops.
+    """
+    tail = chunk_size % step
+    if tail:
+        return re.compile(r'(\S+(?:\s+\S+){0,%d})(?:\s+\S+){0,%d}' % (tail - 1, step - tail))
+    return re.compile(r'()\S+(?:\s+\S+){0,%d}' % (step - 1))
+
+
+_WORD_COUNT_SEGMENT = 1 << 16
+_WORD_RE = re.compile(r'\S+')
+
+# Bump when an analysis step's output changes so stale cache entries are ignored
+_DOCINT_CACHE_VERSION = 1
+
+
+def _count_words(text: str) -> int:
+    """
+    Same value as ``len(text.split())`` without building a list of every word.
+
+    The text is split in ~64K-character segments, each extended to the end of the
+    word it stops in, so the transient list stays small (and cache-resident).
+    """
+    count = 0
+    start, length = 0, len(text)
+    while start < length:
+        end = start + _WORD_COUNT_SEGMENT
+        if end < length:
+            word = _WORD_RE.match(text, end)
+            if word:
+                end = word.end()
+        count += len(text[start:end].split())
+        start = end
+    return count
+
+
+def _batch_workers(count: int, max_workers: Optional[int]) -> Tuple[int, int]:
+    """Worker count and ``map`` chunksize for a batch of ``count`` items."""
+    workers = min(max_workers or os.cpu_count() or 1, count)
+    return workers, max(1, count // (4 * max(workers, 1)))
+
+
+# Per-process DocumentIntelligence used by categorize_batch workers
+_worker_intel = None
+
+
+def _init_categorize_worker(intel: 'DocumentIntelligence') -> None:
+    global _worker_intel
+    _worker_intel = intel
+
+
+def _categorize_in_worker(item: Tuple[str, str]) -> Dict[str, Any]:
+    return _worker_intel._categorize(*item)
+
+
+def _chunk_in_worker(item: Tuple[str, str, int, int]) -> List[Dict[str, Any]]:
+    return SmartChunker().chunk(*item)
+
 
 class DocumentIntelligence:
     """
@@ -19,7 +95,52 @@ class DocumentIntelligence:
     - Relationship detection
     """
 
-    def __init__(self):
+    __slots__ = ('cache_dir', 'categories', '_pattern_categories', '_extension_categories',
+                 '_content_bonus', '_category_re', '_pattern_prefixes')
+
+    # Extractors that only look at the start of a document never see more than this
+    HEAD_LIMIT = 8192
+
+    # Compiled once per process; extractors run for every ingested document
+    _CODE_RE = re.compile(r'```|def |class |function |import ')
+    _URL_RE = re.compile(r'https?://\S+')
+    _VERSION_RES = (
+        re.compile(r'[Vv]ersion\s*[:=]?\s*([\d.]+)'),
+        re.compile(r'v([\d.]+)'),
+        re.compile(r'release\s*[:=]?\s*([\d.]+)'),
+    )
+    _DATE_RES = (
+        re.compile(r'\d{4}-\d{2}-\d{2}'),
+        re.compile(r'\d{2}/\d{2}/\d{4}'),
+        re.compile(r'(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+\d{1,2},?\s+\d{4}'),
+    )
+    # Speaker-style patterns match `^Name:` where the name may span lines. When a
+    # candidate name is *not* followed by ':' the whole run is still consumed
+    # (group 2 unset) so the scan never restarts at every line inside it; without
+    # this, long colon-free prose makes the backtracking engine quadratic.
+    _PARTICIPANT_RE = re.compile(r'^([A-Z][A-Za-z\s]+)(:\s)?', re.MULTILINE)
+    _EMAIL_HEADER_RES = {
+        'sender': re.compile(r'From:\s*(.+)'),
+        'recipient': re.compile(r'To:\s*(.+)'),
+        'subject': re.compile(r'Subject:\s*(.+)'),
+        'date': re.compile(r'Date:\s*(.+)'),
+    }
+    _SECTION_RES = (
+        re.compile(r'^#{1,3}\s+(.+)$', re.MULTILINE),  # Markdown headers
+        re.compile(r'^(\d+\.?\s+[A-Z].+)$', re.MULTILINE),  # Numbered sections
+        re.compile(r'^(Chapter\s+\d+.*)$', re.MULTILINE),  # Chapter headings
+    )
+    # Length filter (> 3 chars) folded into the pattern
+    _TOPIC_WORD_RE = re.compile(r'\b[a-z]{4,}\b')
+    _STOP_WORDS = frozenset({
+        'the', 'is', 'at', 'which', 'on', 'and', 'a', 'an', 'to', 'for', 'of', 'in',
+        'with', 'as', 'by', 'that', 'this', 'it', 'from', 'or', 'but'
+    })
+
+    def __init__(self, cache_dir: Optional[Path] = None):
+        # Optional on-disk cache of analysis results, keyed by content hash
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+
         # Document categorization patterns
         self.categories = {
             'technical': {
@@ -66,37 +187,144 @@ class DocumentIntelligence:
             }
         }
 
+        # One scanner for every category pattern: a zero-width lookahead reports a
+        # match at each start offset, so overlapping keywords ('transcript' /
+        # 'script') are all seen in a single linear pass.
+        self._pattern_categories: Dict[str, List[str]] = {}
+        self._extension_categories: Dict[str, List[str]] = {}
+        for category, config in self.categories.items():
+            for pattern in config['patterns']:
+                self._pattern_categories.setdefault(pattern, []).append(category)
+            for extension in frozenset(config['extensions']):
+                self._extension_categories.setdefault(extension, []).append(category)
+        # Most that content keywords (3 points per distinct pattern) can add to a category
+        self._content_bonus = {
+            category: 3 * sum(category in cats for cats in self._pattern_categories.values())
+            for category in self.categories
+        }
+        alternation = '|'.join(
+            re.escape(p) for p in sorted(self._pattern_categories, key=len, reverse=True)
+        )
+        self._category_re = re.compile(f'(?=({alternation}))')
+        # Longest-first alternation hides shorter keywords that start at the same offset
+        self._pattern_prefixes = {
+            p: frozenset(q for q in self._pattern_categories if q != p and p.startswith(q))
+            for p in self._pattern_categories
+        }
+
+    def _find_patterns(self, text: str) -> set:
+        """Return the set of category patterns that occur anywhere in ``text``."""
+        found = {m.group(1) for m in self._category_re.finditer(text)}
+        return found.union(*(self._pattern_prefixes[p] for p in found))
+
+    def _cache_key(self, kind: str, *parts: str) -> Optional[str]:
+        """Hash the inputs of an analysis step; None when caching is disabled."""
+        if self.cache_dir is None:
+            return None
+        h = hashlib.blake2b(f"v{_DOCINT_CACHE_VERSION}:{kind}".encode(), digest_size=20)
+        for part in parts:
+            h.update(b'\0')
+            h.update(part.encode('utf-8', 'surrogatepass'))
+        return h.hexdigest()
+
+    def _cache_get(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        if key is None:
+            return None
+        try:
+            return orjson.loads((self.cache_dir / key[:2] / f"{key}.json").read_bytes())
+        except (OSError, orjson.JSONDecodeError):
+            return None
+
+    def _cache_put(self, key: Optional[str], value: Dict[str, Any]) -> None:
+        if key is None:
+            return
+        path = self.cache_dir / key[:2] / f"{key}.json"
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(orjson.dumps(value))
+        except (OSError, TypeError):
+            pass
+
     def categorize_document(self, filepath: str, content: str) -> Dict[str, Any]:
         """
         Intelligently categorize a document based on multiple signals.
+
+        Only the first 1000 characters of ``content`` are inspected.
+        """
+        name = Path(filepath).name
+        head = content[:1000]
+        key = self._cache_key('category', name, head)
+        result = self._cache_get(key)
+        if result is None:
+            result = self._categorize(name, head)
+            self._cache_put(key, result)
+        return result
+
+    def categorize_batch(self, items: List[Tuple[str, str]],
+                         max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
         """
+        Categorize many ``(filepath, content)`` pairs, in order, across a process pool.
+
+        Cache hits are answered in this process and only the 1000-character heads
+        of the misses are sent to the workers. ``max_workers`` defaults to the CPU
+        count; with one worker (or one document) everything runs inline.
+        """
+        results: List[Optional[Dict[str, Any]]] = []
+        pending = []  # (index, cache key, (name, head))
+        for filepath, content in items:
+            name = Path(filepath).name
+            head = content[:1000]
+            key = self._cache_key('category', name, head)
+            result = self._cache_get(key)
+            if result is None:
+                pending.append((len(results), key, (name, head)))
+            results.append(result)
+
+        workers, chunksize = _batch_workers(len(pending), max_workers)
+        args = [work for _, _, work in pending]
+        if workers > 1:
+            # The instance is pickled once per worker, carrying any custom categories
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_categorize_worker,
+                                     initargs=(self,)) as pool:
+                computed = list(pool.map(_categorize_in_worker, args, chunksize=chunksize))
+        else:
+            computed = [self._categorize(*work) for work in args]
+
+        for (index, key, _), result in zip(pending, computed):
+            self._cache_put(key, result)
+            results[index] = result
+        return results
+
+    def _categorize(self, filepath: str, content: str) -> Dict[str, Any]:
         filepath = Path(filepath)
         filename_lower = filepath.name.lower()
+        suffix = filepath.suffix.lower()
 
         # Score each category
-        scores = {}
-        for category, config in self.categories.items():
-            score = 0
+        scores = dict.fromkeys(self.categories, 0)
 
-            # Check filename patterns
-            for pattern in config['patterns']:
-                if pattern in filename_lower:
-                    score += 10
+        # Check filename patterns
+        for pattern in self._find_patterns(filename_lower):
+            for category in self._pattern_categories[pattern]:
+                scores[category] += 10
 
-            # Check extension
-            if filepath.suffix.lower() in config['extensions']:
-                score += 5
+        # Check extension
+        for category in self._extension_categories.get(suffix, ()):
+            scores[category] += 5
 
-            # Check content patterns (first 1000 chars)
-            content_sample = content[:1000].lower()
-            for pattern in config['patterns']:
-                if pattern in content_sample:
-                    score += 3
-
-            scores[category] = score
-
-        # Get the best category
+        # Check content patterns (first 1000 chars), unless the filename and
+        # extension already cap confidence and no other category can catch up
         best_category = max(scores.items(), key=lambda x: x[1])
+        if best_category[1] < 20 or any(
+            score + self._content_bonus[category] >= best_category[1]
+            for category, score in scores.items() if category != best_category[0]
+        ):
+            for pattern in self._find_patterns(content[:1000].lower()):
+                for category in self._pattern_categories[pattern]:
+                    scores[category] += 3
+
+            # Get the best category
+            best_category = max(scores.items(), key=lambda x: x[1])
 
         # Default to 'general' if no strong match
         if best_category[1] < 5:
@@ -119,77 +347,85 @@ class DocumentIntelligence:
             'metadata_extractors': self._get_extractors(category_name)
         }
 
+    # Metadata extractors per category, built once rather than on every lookup
+    _CATEGORY_EXTRACTORS = {
+        'technical': ('version', 'product', 'sections'),
+        'conversation': ('participants', 'datetime', 'topics'),
+        'correspondence': ('sender', 'recipient', 'date', 'subject'),
+        'reference': ('endpoints', 'methods', 'parameters'),
+        'literature': ('author', 'title', 'chapters'),
+        'data': ('date_range', 'metrics', 'summary'),
+        'media': ('duration', 'speakers', 'timestamps')
+    }
+
     def _get_extractors(self, category: str) -> List[str]:
         """Get relevant metadata extractors for a category."""
-        extractors = {
-            'technical': ['version', 'product', 'sections'],
-            'conversation': ['participants', 'datetime', 'topics'],
-            'correspondence': ['sender', 'recipient', 'date', 'subject'],
-            'reference': ['endpoints', 'methods', 'parameters'],
-            'literature': ['author', 'title', 'chapters'],
-            'data': ['date_range', 'metrics', 'summary'],
-            'media': ['duration', 'speakers', 'timestamps']
-        }
-        return extractors.get(category, ['basic'])
+        return list(self._CATEGORY_EXTRACTORS.get(category, ('basic',)))
 
     def extract_metadata(self, content: str, extractors: List[str]) -> Dict[str, Any]:
-        """Extract relevant metadata based on document type."""
+        """
+        Extract relevant metadata based on document type.
+
+        Each extractor runs at most once per document and stops scanning as soon
+        as it has collected the matches it keeps, so large documents are not
+        swept end-to-end for a handful of results. Extractors that only inspect
+        the start of the document share one bounded ``HEAD_LIMIT`` slice.
+        """
+        key = self._cache_key('metadata', ','.join(extractors), content)
+        metadata = self._cache_get(key)
+        if metadata is not None:
+            return metadata
+
         metadata = {}
+        head = content[:self.HEAD_LIMIT]
 
-        for extractor in extractors:
-            if extractor == 'basic':
-                metadata.update(self._extract_basic(content))
-            elif extractor == 'version':
-                metadata.update(self._extract_version(content))
-            elif extractor == 'datetime':
-                metadata.update(self._extract_datetime(content))
-            elif extractor == 'participants':
-                metadata.update(self._extract_participants(content))
-            elif extractor == 'sender':
-                metadata.update(self._extract_email_headers(content))
-            elif extractor == 'sections':
-                metadata.update(self._extract_sections(content))
-            elif extractor == 'topics':
-                metadata.update(self._extract_topics(content))
+        for extractor in dict.fromkeys(extractors):
+            method = self._EXTRACTOR_METHODS.get(extractor)
+            if method:
+                text = head if extractor in self._HEAD_EXTRACTORS else content
+                metadata.update(getattr(self, method)(text))
 
+        self._cache_put(key, metadata)
         return metadata
 
+    # Extractor name -> method; names without an implementation are skipped
+    _EXTRACTOR_METHODS = {
+        'basic': '_extract_basic',
+        'version': '_extract_version',
+        'datetime': '_extract_datetime',
+        'participants': '_extract_participants',
+        'sender': '_extract_email_headers',
+        'sections': '_extract_sections',
+        'topics': '_extract_topics',
+    }
+    _HEAD_EXTRACTORS = frozenset({'version', 'datetime', 'participants', 'sender'})
+
     def _extract_basic(self, content: str) -> Dict:
         """Extract basic metadata."""
-        lines = content.split('\n')
         return {
-            'line_count': len(lines),
-            'word_count': len(content.split()),
-            'has_code': bool(re.search(r'```|def |class |function |import ', content)),
-            'has_urls': bool(re.search(r'https?://\S+', content))
+            'line_count': content.count('\n') + 1,
+            'word_count': _count_words(content),
+            'has_code': bool(self._CODE_RE.search(content)),
+            'has_urls': bool(self._URL_RE.search(content))
         }
 
     def _extract_version(self, content: str) -> Dict:
         """Extract version information."""
-        version_patterns = [
-            r'[Vv]ersion\s*[:=]?\s*([\d.]+)',
-            r'v([\d.]+)',
-            r'release\s*[:=]?\s*([\d.]+)'
-        ]
-
-        for pattern in version_patterns:
-            match = re.search(pattern, content[:2000])
+        head = content[:2000]
+        for pattern in self._VERSION_RES:
+            match = pattern.search(head)
             if match:
                 return {'version': match.group(1)}
         return {}
 
     def _extract_datetime(self, content: str) -> Dict:
         """Extract date/time information."""
-        date_patterns = [
-            r'\d{4}-\d{2}-\d{2}',
-            r'\d{2}/\d{2}/\d{4}',
-            r'(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+\d{1,2},?\s+\d{4}'
-        ]
-
+        head = content[:5000]
         dates_found = []
-        for pattern in date_patterns:
-            matches = re.findall(pattern, content[:5000])
-            dates_found.extend(matches[:3])  # Limit to first 3
+        for pattern in self._DATE_RES:
+            if len(dates_found) >= 3:  # Limit to first 3
+                break
+            dates_found.extend(_first_matches(pattern, head, 3))
 
         # Convert list to comma-separated string for ChromaDB compatibility
         return {'dates_mentioned': ', '.join(dates_found[:3])} if dates_found else {}
@@ -197,9 +433,13 @@ class DocumentIntelligence:
     def _extract_participants(self, content: str) -> Dict:
         """Extract conversation participants."""
         # Look for patterns like "John:", "Speaker 1:", etc.
-        participant_pattern = r'^([A-Z][A-Za-z\s]+):\s'
-        matches = re.findall(participant_pattern, content[:5000], re.MULTILINE)
-        unique_participants = list(set(matches))[:10]  # Limit to 10
+        # First 10 distinct speakers, in order of appearance
+        unique_participants = {}
+        for match in self._PARTICIPANT_RE.finditer(content[:5000]):
+            if match.group(2):
+                unique_participants[match.group(1)] = None
+                if len(unique_participants) == 10:
+                    break
 
         # Convert list to comma-separated string for ChromaDB compatibility
         return {'participants': ', '.join(unique_participants)} if unique_participants else {}
@@ -207,15 +447,12 @@ class DocumentIntelligence:
     def _extract_email_headers(self, content: str) -> Dict:
         """Extract email headers."""
         headers = {}
-        patterns = {
-            'sender': r'From:\s*(.+)',
-            'recipient': r'To:\s*(.+)',
-            'subject': r'Subject:\s*(.+)',
-            'date': r'Date:\s*(.+)'
-        }
-
-        for key, pattern in patterns.items():
-            match = re.search(pattern, content[:2000])
+        head = content[:2000]
+        # Every header ends in ':'; one C-level scan rules out most non-email text
+        if ':' not in head:
+            return headers
+        for key, pattern in self._EMAIL_HEADER_RES.items():
+            match = pattern.search(head)
             if match:
                 headers[key] = match.group(1).strip()
 
@@ -224,16 +461,11 @@ class DocumentIntelligence:
     def _extract_sections(self, content: str) -> Dict:
         """Extract document sections/chapters."""
         # Look for markdown headers or numbered sections
-        section_patterns = [
-            r'^#{1,3}\s+(.+)$',  # Markdown headers
-            r'^(\d+\.?\s+[A-Z].+)$',  # Numbered sections
-            r'^(Chapter\s+\d+.*)$'  # Chapter headings
-        ]
-
         sections = []
-        for pattern in section_patterns:
-            matches = re.findall(pattern, content, re.MULTILINE)
-            sections.extend(matches[:20])  # Limit to 20
+        for pattern in self._SECTION_RES:
+            if len(sections) >= 20:  # Limit to 20
+                break
+            sections.extend(_first_matches(pattern, content, 20))
 
         # Convert list to comma-separated string for ChromaDB compatibility
         return {'sections': ' | '.join(sections[:20])} if sections else {}
@@ -243,18 +475,15 @@ class DocumentIntelligence:
         # This is a simplified topic extraction
         # In production, you'd use NLP libraries like spaCy or NLTK
 
-        # Remove common words
-        stop_words = {'the', 'is', 'at', 'which', 'on', 'and', 'a', 'an', 'to', 'for', 'of', 'in', 'with', 'as', 'by', 'that', 'this', 'it', 'from', 'or', 'but'}
-
-        words = re.findall(r'\b[a-z]+\b', content.lower())
-        word_freq = {}
-
-        for word in words:
-            if word not in stop_words and len(word) > 3:
-                word_freq[word] = word_freq.get(word, 0) + 1
+        # Count everything except common words
+        stop_words = self._STOP_WORDS
+        word_freq = Counter(
+            word for word in self._TOPIC_WORD_RE.findall(content.lower())
+            if word not in stop_words
+        )
 
         # Get top 10 most frequent words
-        topics = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:10]
+        topics = word_freq.most_common(10)
 
         # Convert list to comma-separated string for ChromaDB compatibility
         return {'key_terms': ', '.join([word for word, freq in topics])} if topics else {}
@@ -265,17 +494,49 @@ class SmartChunker:
     Implements intelligent chunking strategies based on document type.
     """
 
-    def __init__(self):
-        self.strategies = {
-            'sliding_window': self.chunk_sliding_window,
-            'section_aware': self.chunk_by_sections,
-            'conversation_aware': self.chunk_by_conversation,
-            'message_boundary': self.chunk_by_messages,
-            'endpoint_aware': self.chunk_by_endpoints,
-            'chapter_aware': self.chunk_by_chapters,
-            'record_aware': self.chunk_by_records,
-            'time_aware': self.chunk_by_timestamps
-        }
+    __slots__ = ()
+
+    # Strategy name -> chunking method; unknown strategies use the sliding window
+    strategies = {
+        'sliding_window': 'chunk_sliding_window',
+        'section_aware': 'chunk_by_sections',
+        'conversation_aware': 'chunk_by_conversation',
+        'message_boundary': 'chunk_by_messages',
+        'endpoint_aware': 'chunk_by_endpoints',
+        'chapter_aware': 'chunk_by_chapters',
+        'record_aware': 'chunk_by_records',
+        'time_aware': 'chunk_by_timestamps'
+    }
+
+    _WORD_SPAN_RE = re.compile(r'\S+')
+    _SECTION_SPLIT_RE = re.compile(r'(^#{1,6}\s+.+$|^=+$|^-+$|\n\n\n+)', re.MULTILINE)
+    # Linear form of `^(Name):\s*(.+?)(?=^Name:|$)` (MULTILINE|DOTALL): the turn is
+    # the rest of the line from the first non-blank character, or the final
+    # character when only whitespace follows. See DocumentIntelligence for why
+    # unmatched name runs are consumed rather than rejected.
+    _TURN_RE = re.compile(r'^([A-Z][A-Za-z\s]+)(?::\s*([^\s][^\n]*|\s\Z))?', re.MULTILINE)
+    _MESSAGE_SPLIT_RE = re.compile(r'(From:|Subject:|Date:|---+|===+|\n\n\n+)')
+    _ENDPOINT_RES = tuple(
+        re.compile(p, re.MULTILINE)
+        for p in (
+            r'^(GET|POST|PUT|DELETE|PATCH)\s+/\S+',
+            r'^### .+ Endpoint',
+            r'^## /\S+',
+        )
+    )
+    _CHAPTER_RES = tuple(
+        re.compile(p, re.MULTILINE)
+        for p in (
+            r'^Chapter\s+\d+',
+            r'^CHAPTER\s+[IVX]+',
+            r'^\d+\.\s+[A-Z]',
+        )
+    )
+    _TIMESTAMP_RES = (
+        re.compile(r'(\d{2}:\d{2}:\d{2})'),  # HH:MM:SS
+        re.compile(r'(\[\d{2}:\d{2}\])'),     # [MM:SS]
+        re.compile(r'(\d{2}:\d{2})'),          # MM:SS
+    )
 
     def chunk(self, content: str, strategy: str, chunk_size: int = 800, overlap: int = 100) -> List[Dict[str, Any]]:
         """
@@ -283,63 +544,111 @@ class SmartChunker:
 
         Returns list of chunks with metadata about chunk type and boundaries.
         """
-        chunk_func = self.strategies.get(strategy, self.chunk_sliding_window)
+        chunk_func = getattr(self, self.strategies.get(strategy, 'chunk_sliding_window'))
         return chunk_func(content, chunk_size, overlap)
 
+    def chunk_batch(self, items: List[Tuple[str, str, int, int]],
+                    max_workers: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Chunk many ``(content, strategy, chunk_size, overlap)`` tuples, in order.
+
+        Uses processes rather than threads: CPython's ``re`` engine holds the GIL
+        while matching, so threads would not overlap the chunking work.
+        """
+        workers, chunksize = _batch_workers(len(items), max_workers)
+        if workers <= 1:
+            return [self.chunk(*item) for item in items]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(_chunk_in_worker, items, chunksize=chunksize))
+
     def chunk_sliding_window(self, content: str, chunk_size: int, overlap: int) -> List[Dict]:
-        """Traditional sliding window chunking."""
-        words = content.split()
-        chunks = []
+        """
+        Traditional sliding window chunking.
+
+        Windows are measured in whitespace-separated words, but each chunk is a
+        slice of the original text between its first and last word, so no word
+        list is materialised and the source formatting is preserved. The text is
+        scanned in blocks of ``chunk_size - overlap`` words (one per window) by a
+        pattern compiled for this size/overlap pair, keeping the per-word work
+        inside the regex engine.
+        """
+        step = chunk_size - overlap
+        if step == 0:
+            raise ValueError("chunk_size must differ from overlap")
+        if step < 0:
+            return []
+
+        blocks = [(m.start(), m.end(1), m.end())
+                  for m in _window_block_re(step, chunk_size).finditer(content)]
+        if not blocks:
+            return []
 
-        for i in range(0, len(words), chunk_size - overlap):
-            chunk_words = words[i:i + chunk_size]
-            chunk_text = ' '.join(chunk_words)
+        last_start, _, last_end = blocks[-1]
+        total = (len(blocks) - 1) * step + len(self._WORD_SPAN_RE.findall(content, last_start, last_end))
+        span, tail = divmod(chunk_size, step)
+
+        chunks = []
+        for block, (start_offset, _, _) in enumerate(blocks):
+            first_word = block * step
+            last_word = first_word + chunk_size
+            if last_word >= total:
+                last_word, end_offset = total, last_end
+            elif tail:
+                end_offset = blocks[block + span][1]
+            else:
+                end_offset = blocks[block + span - 1][2]
 
             chunks.append({
-                'text': chunk_text,
+                'text': content[start_offset:end_offset],
                 'type': 'sliding_window',
-                'start_idx': i,
-                'end_idx': min(i + chunk_size, len(words))
+                'start_idx': first_word,
+                'end_idx': last_word
             })
 
         return chunks
 
     def chunk_by_sections(self, content: str, chunk_size: int, overlap: int) -> List[Dict]:
         """Chunk respecting section boundaries."""
-        # Detect sections
-        section_pattern = r'(^#{1,6}\s+.+$|^=+$|^-+$|\n\n\n+)'
-        sections = re.split(section_pattern, content, flags=re.MULTILINE)
+        # Word start/end offsets; a chunk is always a contiguous run of words
+        starts, ends = [], []
+        for match in self._WORD_SPAN_RE.finditer(content):
+            starts.append(match.start())
+            ends.append(match.end())
+
+        # Detect sections: every delimiter match closes the section before it
+        # and is itself a section, exactly like a capturing re.split
+        boundaries = []
+        for match in self._SECTION_SPLIT_RE.finditer(content):
+            boundaries.extend(match.span())
+        boundaries.append(len(content))
 
         chunks = []
-        current_chunk = []
-        current_size = 0
+        first = last = 0  # current chunk covers words [first, last)
 
-        for section in sections:
-            section_words = section.split()
-            section_size = len(section_words)
+        for boundary in boundaries:
+            section_end = bisect_left(starts, boundary)
+            section_size = section_end - last
 
-            if current_size + section_size > chunk_size and current_chunk:
+            if (last - first) + section_size > chunk_size and last > first:
                 # Save current chunk
                 chunks.append({
-                    'text': ' '.join(current_chunk),
+                    'text': content[starts[first]:ends[last - 1]],
                     'type': 'section',
                     'boundary': 'section_end'
                 })
 
                 # Start new chunk with overlap
-                if overlap > 0 and len(current_chunk) > overlap:
-                    current_chunk = current_chunk[-overlap:]
+                if overlap > 0 and last - first > overlap:
+                    first = last - overlap
                 else:
-                    current_chunk = []
-                current_size = len(current_chunk)
+                    first = last
 
-            current_chunk.extend(section_words)
-            current_size += section_size
+            last = section_end
 
         # Don't forget the last chunk
-        if current_chunk:
+        if last > first:
             chunks.append({
-                'text': ' '.join(current_chunk),
+                'text': content[starts[first]:ends[last - 1]],
                 'type': 'section',
                 'boundary': 'document_end'
             })
@@ -348,48 +657,46 @@ class SmartChunker:
 
     def chunk_by_conversation(self, content: str, chunk_size: int, overlap: int) -> List[Dict]:
         """Chunk keeping conversation turns together."""
-        # Pattern for conversation turns (e.g., "Speaker:", "John:", etc.)
-        turn_pattern = r'^([A-Z][A-Za-z\s]+):\s*(.+?)(?=^[A-Z][A-Za-z\s]+:|$)'
-
-        turns = re.findall(turn_pattern, content, re.MULTILINE | re.DOTALL)
+        # Conversation turns (e.g., "Speaker:", "John:", etc.)
+        turns = [m.groups() for m in self._TURN_RE.finditer(content) if m.group(2) is not None]
 
         if not turns:
             return self.chunk_sliding_window(content, chunk_size, overlap)
 
         chunks = []
         current_chunk = []
-        current_speakers = set()
+        current_speakers = {}  # insertion-ordered set of speakers in the chunk
         current_size = 0
 
         for speaker, text in turns:
-            turn_size = len(text.split())
+            turn_size = _count_words(text)
 
             if current_size + turn_size > chunk_size and current_chunk:
                 chunks.append({
                     'text': '\n'.join(current_chunk),
                     'type': 'conversation',
-                    'speakers': ', '.join(list(current_speakers))  # Convert to string for ChromaDB
+                    'speakers': ', '.join(current_speakers)  # Convert to string for ChromaDB
                 })
 
                 # Keep last turn for context
                 if overlap > 0:
                     current_chunk = [f"{speaker}: {text[:overlap]}"]
-                    current_speakers = {speaker}
+                    current_speakers = {speaker: None}
                     current_size = min(overlap, turn_size)
                 else:
                     current_chunk = []
-                    current_speakers = set()
+                    current_speakers = {}
                     current_size = 0
 
             current_chunk.append(f"{speaker}: {text}")
-            current_speakers.add(speaker)
+            current_speakers[speaker] = None
             current_size += turn_size
 
         if current_chunk:
             chunks.append({
                 'text': '\n'.join(current_chunk),
                 'type': 'conversation',
-                'speakers': ', '.join(list(current_speakers))  # Convert to string for ChromaDB
+                'speakers': ', '.join(current_speakers)  # Convert to string for ChromaDB
             })
 
         return chunks
@@ -397,15 +704,14 @@ class SmartChunker:
     def chunk_by_messages(self, content: str, chunk_size: int, overlap: int) -> List[Dict]:
         """Chunk by message boundaries (emails, etc.)."""
         # Look for email-like boundaries
-        message_boundary = r'(From:|Subject:|Date:|---+|===+|\n\n\n+)'
-        messages = re.split(message_boundary, content)
+        messages = self._MESSAGE_SPLIT_RE.split(content)
 
         chunks = []
         current_chunk = []
         current_size = 0
 
         for msg in messages:
-            msg_size = len(msg.split())
+            msg_size = _count_words(msg)
 
             if current_size + msg_size > chunk_size and current_chunk:
                 chunks.append({
@@ -429,83 +735,66 @@ class SmartChunker:
 
         return chunks if chunks else self.chunk_sliding_window(content, chunk_size, overlap)
 
-    def chunk_by_endpoints(self, content: str, chunk_size: int, overlap: int) -> List[Dict]:
-        """Chunk API documentation by endpoints."""
-        # Look for API endpoint patterns
-        endpoint_patterns = [
-            r'^(GET|POST|PUT|DELETE|PATCH)\s+/\S+',
-            r'^### .+ Endpoint',
-            r'^## /\S+'
-        ]
-
-        # Try to split by endpoints
-        for pattern in endpoint_patterns:
-            if re.search(pattern, content, re.MULTILINE):
-                endpoints = re.split(f'({pattern})', content, flags=re.MULTILINE)
-
-                chunks = []
-                current_chunk = []
-                current_endpoint = None
+    @staticmethod
+    def _split_at_headings(content: str, pattern: re.Pattern) -> List[Tuple[Optional[str], str]]:
+        """
+        Cut ``content`` at every match of ``pattern`` in one pass.
 
-                for part in endpoints:
-                    if re.match(pattern, part):
-                        if current_chunk:
-                            chunks.append({
-                                'text': '\n'.join(current_chunk),
-                                'type': 'api_endpoint',
-                                'endpoint': current_endpoint
-                            })
-                        current_endpoint = part.strip()
-                        current_chunk = [part]
-                    else:
-                        current_chunk.append(part)
+        Returns ``(heading, text)`` pairs where ``text`` is the slice of the source
+        from the heading up to the next one; any non-blank text before the first
+        heading comes first with a ``None`` heading. Empty when nothing matches.
+        """
+        matches = list(pattern.finditer(content))
+        if not matches:
+            return []
 
-                if current_chunk:
-                    chunks.append({
-                        'text': '\n'.join(current_chunk),
-                        'type': 'api_endpoint',
-                        'endpoint': current_endpoint
-                    })
+        sections = []
+        preamble = content[:matches[0].start()]
+        if preamble.strip():
+            sections.append((None, preamble))
+        for match, following in zip(matches, matches[1:] + [None]):
+            end = following.start() if following else len(content)
+            sections.append((match.group(0).strip(), content[match.start():end]))
+        return sections
 
-                return chunks
+    def chunk_by_endpoints(self, content: str, chunk_size: int, overlap: int) -> List[Dict]:
+        """Chunk API documentation by endpoints."""
+        # Split by the first endpoint pattern that occurs in the document
+        for pattern in self._ENDPOINT_RES:
+            sections = self._split_at_headings(content, pattern)
+            if sections:
+                return [{
+                    'text': text,
+                    'type': 'api_endpoint',
+                    'endpoint': endpoint
+                } for endpoint, text in sections]
 
         return self.chunk_by_sections(content, chunk_size, overlap)
 
     def chunk_by_chapters(self, content: str, chunk_size: int, overlap: int) -> List[Dict]:
         """Chunk books/long documents by chapters."""
-        chapter_patterns = [
-            r'^Chapter\s+\d+',
-            r'^CHAPTER\s+[IVX]+',
-            r'^\d+\.\s+[A-Z]'
-        ]
-
-        for pattern in chapter_patterns:
-            if re.search(pattern, content, re.MULTILINE):
-                chapters = re.split(f'({pattern})', content, flags=re.MULTILINE)
+        for pattern in self._CHAPTER_RES:
+            sections = self._split_at_headings(content, pattern)
+            if not sections:
+                continue
 
-                chunks = []
-                current_chapter = None
-
-                for i in range(0, len(chapters), 2):
-                    if i + 1 < len(chapters):
-                        chapter_title = chapters[i] if i > 0 else None
-                        chapter_content = chapters[i + 1] if i == 0 else chapters[i] + chapters[i + 1]
-
-                        # Further chunk if chapter is too long
-                        if len(chapter_content.split()) > chunk_size:
-                            sub_chunks = self.chunk_sliding_window(chapter_content, chunk_size, overlap)
-                            for sub_chunk in sub_chunks:
-                                sub_chunk['chapter'] = chapter_title
-                                sub_chunk['type'] = 'chapter_section'
-                                chunks.append(sub_chunk)
-                        else:
-                            chunks.append({
-                                'text': chapter_content,
-                                'type': 'chapter',
-                                'chapter': chapter_title
-                            })
+            chunks = []
+            for chapter_title, chapter_content in sections:
+                # Further chunk if chapter is too long
+                if _count_words(chapter_content) > chunk_size:
+                    sub_chunks = self.chunk_sliding_window(chapter_content, chunk_size, overlap)
+                    for sub_chunk in sub_chunks:
+                        sub_chunk['chapter'] = chapter_title
+                        sub_chunk['type'] = 'chapter_section'
+                        chunks.append(sub_chunk)
+                else:
+                    chunks.append({
+                        'text': chapter_content,
+                        'type': 'chapter',
+                        'chapter': chapter_title
+                    })
 
-                return chunks
+            return chunks
 
         return self.chunk_by_sections(content, chunk_size, overlap)
 
@@ -524,7 +813,7 @@ class SmartChunker:
             for line in lines[1:]:
                 current_chunk.append(line)
 
-                if len('\n'.join(current_chunk).split()) > chunk_size:
+                if _count_words('\n'.join(current_chunk)) > chunk_size:
                     chunks.append({
                         'text': header + '\n' + '\n'.join(current_chunk),
                         'type': 'records',
@@ -545,24 +834,17 @@ class SmartChunker:
 
     def chunk_by_timestamps(self, content: str, chunk_size: int, overlap: int) -> List[Dict]:
         """Chunk time-based content (subtitles, transcripts with timestamps)."""
-        # Look for timestamp patterns
-        timestamp_patterns = [
-            r'(\d{2}:\d{2}:\d{2})',  # HH:MM:SS
-            r'(\[\d{2}:\d{2}\])',     # [MM:SS]
-            r'(\d{2}:\d{2})'          # MM:SS
-        ]
-
-        for pattern in timestamp_patterns:
-            if re.search(pattern, content):
+        for pattern in self._TIMESTAMP_RES:
+            if pattern.search(content):
                 # Split by timestamps
-                parts = re.split(pattern, content)
+                parts = pattern.split(content)
 
                 chunks = []
                 current_chunk = []
                 current_time = None
 
                 for i, part in enumerate(parts):
-                    if re.match(pattern, part):
+                    if pattern.match(part):
                         current_time = part
                     else:
                         if current_time:
@@ -570,7 +852,7 @@ class SmartChunker:
                         else:
                             current_chunk.append(part)
 
-                        if len(' '.join(current_chunk).split()) > chunk_size:
+                        if _count_words(' '.join(current_chunk)) > chunk_size:
                             chunks.append({
                                 'text': ' '.join(current_chunk),
                                 'type': 'timed_content',
@@ -593,82 +875,115 @@ class SmartChunker:
 class DocumentRelationshipDetector:
     """Detects relationships between documents for better context understanding."""
 
+    __slots__ = ()
+
+    _DIGITS_RE = re.compile(r'\d+')
+    _VERSION_TOKEN_RE = re.compile(r'v?\d+(\.\d+)*')
+
     def detect_relationships(self, documents: List[Dict]) -> Dict[str, List[str]]:
         """
         Detect relationships between documents.
         Returns a graph of document relationships.
-        """
-        relationships = {}
-
-        for i, doc1 in enumerate(documents):
-            doc1_id = doc1.get('id', str(i))
-            relationships[doc1_id] = []
-
-            for j, doc2 in enumerate(documents):
-                if i == j:
-                    continue
-
-                doc2_id = doc2.get('id', str(j))
 
-                # Check for various relationship types
-                if self._is_same_series(doc1, doc2):
-                    relationships[doc1_id].append(f"series:{doc2_id}")
-
-                if self._is_response_to(doc1, doc2):
-                    relationships[doc1_id].append(f"response_to:{doc2_id}")
+        Per-document keys are computed once and related documents are found
+        through hash lookups, so the cost grows with the number of documents
+        and relationships rather than with every pair of documents.
+        """
+        ids = [doc.get('id', str(i)) for i, doc in enumerate(documents)]
 
-                if self._shares_participants(doc1, doc2):
-                    relationships[doc1_id].append(f"shared_participants:{doc2_id}")
+        # Check for various relationship types, in the order they are reported
+        related = (
+            ('series', self._same_series_groups(documents)),
+            ('response_to', self._response_groups(documents)),
+            ('shared_participants', self._shared_participant_groups(documents)),
+            ('version_of', self._version_groups(documents)),
+        )
 
-                if self._is_version_of(doc1, doc2):
-                    relationships[doc1_id].append(f"version_of:{doc2_id}")
+        relationships = {}
+        for i, doc_id in enumerate(ids):
+            links = {}
+            for kind, neighbours in related:
+                for j in neighbours.get(i, ()):
+                    if j != i:
+                        links.setdefault(j, []).append(kind)
+            relationships[doc_id] = [
+                f"{kind}:{ids[j]}" for j in sorted(links) for kind in links[j]
+            ]
 
         return relationships
 
-    def _is_same_series(self, doc1: Dict, doc2: Dict) -> bool:
-        """Check if documents are part of the same series."""
-        # Check for similar naming patterns
-        name1 = doc1.get('filename', '').lower()
-        name2 = doc2.get('filename', '').lower()
-
-        # Remove numbers and check similarity
-        base1 = re.sub(r'\d+', '', name1)
-        base2 = re.sub(r'\d+', '', name2)
-
-        return base1 == base2 and base1 != ''
-
-    def _is_response_to(self, doc1: Dict, doc2: Dict) -> bool:
-        """Check if one document is a response to another."""
-        # Check for RE: in subjects or similar patterns
-        if 'subject' in doc1.get('metadata', {}) and 'subject' in doc2.get('metadata', {}):
-            subj1 = doc1['metadata']['subject'].lower()
-            subj2 = doc2['metadata']['subject'].lower()
-
-            return f"re: {subj2}" in subj1 or f"re: {subj1}" in subj2
-
-        return False
+    @staticmethod
+    def _group(keys: Dict[int, Any]) -> Dict[int, List[int]]:
+        """Map each document index to every index sharing its key."""
+        buckets: Dict[Any, List[int]] = {}
+        for i, key in keys.items():
+            buckets.setdefault(key, []).append(i)
+        return {i: buckets[key] for i, key in keys.items()}
+
+    def _same_series_groups(self, documents: List[Dict]) -> Dict[int, List[int]]:
+        """Documents are part of the same series when their names match once numbers are removed."""
+        keys = {}
+        for i, doc in enumerate(documents):
+            base = self._DIGITS_RE.sub('', doc.get('filename', '').lower())
+            if base != '':
+                keys[i] = base
+        return self._group(keys)
+
+    def _response_groups(self, documents: List[Dict]) -> Dict[int, set]:
+        """Documents are related when one subject contains "re: <other subject>"."""
+        subjects = {}
+        for i, doc in enumerate(documents):
+            if 'subject' in doc.get('metadata', {}):
+                subjects[i] = doc['metadata']['subject'].lower()
+
+        by_subject: Dict[str, List[int]] = {}
+        for i, subj in subjects.items():
+            by_subject.setdefault(subj, []).append(i)
+
+        groups: Dict[int, set] = {}
+        for i, subj in subjects.items():
+            # "re: {other}" in subj  <=>  other is a prefix of the text after some "re: "
+            start = subj.find('re: ')
+            while start != -1:
+                tail = subj[start + 4:]
+                for end in range(len(tail) + 1):
+                    for j in by_subject.get(tail[:end], ()):
+                        groups.setdefault(i, set()).add(j)
+                        groups.setdefault(j, set()).add(i)
+                start = subj.find('re: ', start + 1)
+        return groups
+
+    def _shared_participant_groups(self, documents: List[Dict]) -> Dict[int, set]:
+        """Documents are related when their participant collections intersect."""
+        by_participant: Dict[Any, List[int]] = {}
+        members = {}
+        for i, doc in enumerate(documents):
+            participants = set(doc.get('metadata', {}).get('participants', []))
+            if participants:
+                members[i] = participants
+                for p in participants:
+                    by_participant.setdefault(p, []).append(i)
 
-    def _shares_participants(self, doc1: Dict, doc2: Dict) -> bool:
-        """Check if documents share participants."""
-        participants1 = set(doc1.get('metadata', {}).get('participants', []))
-        participants2 = set(doc2.get('metadata', {}).get('participants', []))
-
-        if participants1 and participants2:
-            return len(participants1 & participants2) > 0
-
-        return False
-
-    def _is_version_of(self, doc1: Dict, doc2: Dict) -> bool:
-        """Check if documents are different versions of the same content."""
-        # Check for version indicators
-        v1 = doc1.get('metadata', {}).get('version')
-        v2 = doc2.get('metadata', {}).get('version')
+        return {
+            i: {j for p in participants for j in by_participant[p]}
+            for i, participants in members.items()
+        }
 
-        if v1 and v2 and v1 != v2:
+    def _version_groups(self, documents: List[Dict]) -> Dict[int, List[int]]:
+        """Documents are versions of each other when base names match but versions differ."""
+        keys = {}
+        versions = {}
+        for i, doc in enumerate(documents):
+            version = doc.get('metadata', {}).get('version')
+            if not version:
+                continue
             # Same base name but different versions
-            name1 = re.sub(r'v?\d+(\.\d+)*', '', doc1.get('filename', '')).strip()
-            name2 = re.sub(r'v?\d+(\.\d+)*', '', doc2.get('filename', '')).strip()
-
-            return name1 == name2 and name1 != ''
+            name = self._VERSION_TOKEN_RE.sub('', doc.get('filename', '')).strip()
+            if name != '':
+                keys[i] = name
+                versions[i] = version
 
-        return False
\ No newline at end of file
+        return {
+            i: [j for j in same_name if versions[j] != versions[i]]
+            for i, same_name in self._group(keys).items()
+        }
@@ -3,59 +3,83 @@ Universal file parser for multiple document types.
 Supports PDFs, text files, Word docs, emails, eBooks, and more.
 """
 
+import io
 import os
 import json
 import csv
+import hashlib
+import importlib
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterator, List, Tuple, Optional
 import mimetypes
 from datetime import datetime
-
-# For parsing different file types
-try:
-    import PyPDF2
-    HAS_PDF = True
-except ImportError:
-    HAS_PDF = False
-
-try:
-    from docx import Document
-    HAS_DOCX = True
-except ImportError:
-    HAS_DOCX = False
-
-try:
-    import email
-    from email import policy
-    from email.parser import BytesParser
-    HAS_EMAIL = True
-except ImportError:
-    HAS_EMAIL = False
-
-try:
-    import ebooklib
-    from ebooklib import epub
-    HAS_EPUB = True
-except ImportError:
-    HAS_EPUB = False
-
-try:
-    from bs4 import BeautifulSoup
-    HAS_BS4 = True
-except ImportError:
-    HAS_BS4 = False
-
-try:
-    import markdown
-    HAS_MARKDOWN = True
-except ImportError:
-    HAS_MARKDOWN = False
+from email import policy
+from email.parser import BytesParser
+import orjson
+
+# Optional parser backends are imported on first use, so a run that only sees
+# text files never loads them; find_spec just checks that they are installed.
+def _installed(name: str) -> bool:
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+HAS_PDF = _installed('PyPDF2')
+HAS_DOCX = _installed('docx')
+HAS_EMAIL = True  # standard library
+HAS_EPUB = _installed('ebooklib')
+HAS_BS4 = _installed('bs4')
+HAS_LXML_HTML = _installed('lxml')
+HAS_CHARSET_NORMALIZER = _installed('charset_normalizer')
+
+# BeautifulSoup backend: libxml2-based lxml when installed, else the pure-Python parser
+BS_PARSER = 'lxml' if HAS_LXML_HTML else 'html.parser'
+
+_loaded_modules = {}
+
+
+def _lazy_import(name: str):
+    """Import ``name`` once and remember it; None if it cannot be imported."""
+    try:
+        return _loaded_modules[name]
+    except KeyError:
+        pass
+    try:
+        module = importlib.import_module(name)
+    except ImportError:
+        module = None
+    _loaded_modules[name] = module
+    return module
+
+
+# Bump when a parser's output changes so stale parse-cache entries are ignored
+_PARSE_CACHE_VERSION = 2
+
+# Which optional parsers are available; part of the parse cache key
+_PARSER_FEATURES = f"v{_PARSE_CACHE_VERSION}:" + ''.join('1' if flag else '0' for flag in (
+    HAS_PDF, HAS_DOCX, HAS_EMAIL, HAS_EPUB, HAS_BS4, HAS_LXML_HTML, HAS_CHARSET_NORMALIZER
+))
+
+# Byte-order marks checked before any decoding attempt (UTF-32 LE before its UTF-16 prefix)
+_BOMS = (
+    (b'\xef\xbb\xbf', 'utf-8'),
+    (b'\xff\xfe\x00\x00', 'utf-32-le'),
+    (b'\x00\x00\xfe\xff', 'utf-32-be'),
+    (b'\xff\xfe', 'utf-16-le'),
+    (b'\xfe\xff', 'utf-16-be'),
+)
 
 
 class FileParser:
     """Universal file parser for various document types."""
 
-    def __init__(self):
+    def __init__(self, cache_dir: Optional[Path] = None):
+        # Optional on-disk cache of parsed content, keyed by (path, mtime, size)
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+
         self.parsers = {
             '.txt': self.parse_text,
             '.md': self.parse_markdown,
@@ -82,16 +106,20 @@ class FileParser:
         """
         filepath = Path(filepath)
 
-        if not filepath.exists():
+        # One stat call both checks existence and feeds the metadata
+        try:
+            stat = os.stat(filepath)
+        except (FileNotFoundError, NotADirectoryError):
             return {'content': '', 'metadata': {}, 'error': 'File not found'}
 
-        # Get file extension
-        ext = filepath.suffix.lower()
+        # Get file extension (Path.suffix's rule, on the plain name string)
+        name = filepath.name
+        dot = name.rfind('.')
+        ext = name[dot:].lower() if 0 < dot < len(name) - 1 else ''
 
         # Get basic metadata
-        stat = filepath.stat()
         metadata = {
-            'filename': filepath.name,
+            'filename': name,
             'path': str(filepath.absolute()),
             'size_bytes': stat.st_size,
             'modified': datetime.fromtimestamp(stat.st_mtime).isoformat(),
@@ -99,11 +127,17 @@ class FileParser:
             'mime_type': mimetypes.guess_type(str(filepath))[0] or 'unknown'
         }
 
+        key = self._cache_key(metadata['path'], stat)
+        content = self._cache_get(key)
+        if content is not None:
+            return {'content': content, 'metadata': metadata, 'error': None}
+
         # Choose parser based on extension
         parser = self.parsers.get(ext, self.parse_text)
 
         try:
             content = parser(filepath)
+            self._cache_put(key, content)
             return {
                 'content': content,
                 'metadata': metadata,
@@ -116,20 +150,62 @@ class FileParser:
                 'error': f"Failed to parse {ext} file: {str(e)}"
             }
 
+    def _cache_key(self, path: str, stat: os.stat_result) -> Optional[str]:
+        """Identify one version of a file; None when caching is disabled."""
+        if self.cache_dir is None:
+            return None
+        # Optional parser libraries change the output, so they are part of the key
+        ident = f"{path}\0{stat.st_mtime_ns}\0{stat.st_size}\0{_PARSER_FEATURES}"
+        return hashlib.blake2b(ident.encode('utf-8', 'surrogatepass'), digest_size=20).hexdigest()
+
+    def _cache_get(self, key: Optional[str]) -> Optional[str]:
+        if key is None:
+            return None
+        try:
+            return orjson.loads((self.cache_dir / key[:2] / f"{key}.json").read_bytes())['content']
+        except (OSError, orjson.JSONDecodeError, KeyError, TypeError):
+            return None
+
+    def _cache_put(self, key: Optional[str], content: str) -> None:
+        if key is None:
+            return
+        path = self.cache_dir / key[:2] / f"{key}.json"
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(orjson.dumps({'content': content}))
+        except (OSError, TypeError):
+            pass
+
     def parse_text(self, filepath: Path) -> str:
         """Parse plain text files."""
-        encodings = ['utf-8', 'latin-1', 'cp1252', 'utf-16']
+        # Read once and decode in memory rather than re-reading per candidate encoding
+        data = Path(filepath).read_bytes()
+        text = self._decode(data)
+        # Match text-mode reads, which translate \r\n and \r to \n
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        return text
+
+    @staticmethod
+    def _decode(data: bytes) -> str:
+        """Decode file bytes: BOM first, then UTF-8, then a detected or Latin-1 fallback."""
+        for bom, encoding in _BOMS:
+            if data.startswith(bom):
+                return data[len(bom):].decode(encoding, errors='replace')
 
-        for encoding in encodings:
-            try:
-                with open(filepath, 'r', encoding=encoding) as f:
-                    return f.read()
-            except UnicodeDecodeError:
-                continue
+        try:
+            return data.decode('utf-8')
+        except UnicodeDecodeError:
+            pass
 
-        # If all encodings fail, try binary mode and decode with errors='replace'
-        with open(filepath, 'rb') as f:
-            return f.read().decode('utf-8', errors='replace')
+        charset_normalizer = _lazy_import('charset_normalizer')
+        if charset_normalizer is not None:
+            best = charset_normalizer.from_bytes(data[:65536]).best()
+            if best is not None:
+                return data.decode(best.encoding, errors='replace')
+
+        # Latin-1 maps every byte, so this never fails
+        return data.decode('latin-1')
 
     def parse_markdown(self, filepath: Path) -> str:
         """Parse Markdown files."""
@@ -141,51 +217,51 @@ class FileParser:
 
     def parse_pdf(self, filepath: Path) -> str:
         """Parse PDF files."""
-        if not HAS_PDF:
+        PyPDF2 = _lazy_import('PyPDF2')
+        if PyPDF2 is None:
             # Fallback: Just return that PDF parsing is not available
             return f"[PDF: {filepath.name}] - PDF parsing requires PyPDF2 library"
 
-        text_parts = []
+        # Pages stream into one buffer; each leading "\n" stands in for the old "\n".join
+        buf = io.StringIO()
 
         try:
-            with open(filepath, 'rb') as f:
+            # PyPDF2 issues many small reads; serve them from a 1 MiB buffer
+            with open(filepath, 'rb', buffering=1 << 20) as f:
                 pdf_reader = PyPDF2.PdfReader(f)
                 num_pages = len(pdf_reader.pages)
 
-                text_parts.append(f"[PDF Document: {num_pages} pages]\n")
+                buf.write(f"[PDF Document: {num_pages} pages]\n")
 
                 for page_num, page in enumerate(pdf_reader.pages, 1):
                     try:
                         text = page.extract_text()
                         if text.strip():
-                            text_parts.append(f"\n--- Page {page_num} ---\n{text}")
+                            buf.write(f"\n\n--- Page {page_num} ---\n{text}")
                     except Exception as e:
-                        text_parts.append(f"\n--- Page {page_num} ---\n[Error extracting text: {e}]")
+                        buf.write(f"\n\n--- Page {page_num} ---\n[Error extracting text: {e}]")
 
-                return "\n".join(text_parts)
+                return buf.getvalue()
         except Exception as e:
             return f"[PDF Error: {e}]"
 
     def parse_docx(self, filepath: Path) -> str:
         """Parse Word documents."""
-        if not HAS_DOCX:
+        docx = _lazy_import('docx')
+        if docx is None:
             return f"[DOCX: {filepath.name}] - Word document parsing requires python-docx library"
 
         try:
-            doc = Document(filepath)
-            paragraphs = []
+            doc = docx.Document(filepath)
 
-            # Extract paragraphs
-            for para in doc.paragraphs:
-                if para.text.strip():
-                    paragraphs.append(para.text)
+            # Extract paragraphs; para.text walks the XML, so read it only once
+            paragraphs = [text for text in (para.text for para in doc.paragraphs)
+                          if text and not text.isspace()]
 
             # Also extract text from tables
-            for table in doc.tables:
-                for row in table.rows:
-                    row_text = ' | '.join(cell.text.strip() for cell in row.cells)
-                    if row_text.strip():
-                        paragraphs.append(row_text)
+            rows = (' | '.join(cell.text.strip() for cell in row.cells)
+                    for table in doc.tables for row in table.rows)
+            paragraphs.extend(row_text for row_text in rows if row_text and not row_text.isspace())
 
             return '\n\n'.join(paragraphs)
         except Exception as e:
@@ -209,17 +285,27 @@ class FileParser:
             parts.append(f"Date: {msg.get('Date', 'Unknown')}")
             parts.append("\n---\n")
 
-            # Extract body
+            # Extract body: the first inline text/plain part, else the first text/html one
             body = ""
             if msg.is_multipart():
+                html_part = None
                 for part in msg.walk():
-                    if part.get_content_type() == 'text/plain':
+                    # Attachments are never the body; don't decode them
+                    if part.get_content_disposition() == 'attachment':
+                        continue
+                    content_type = part.get_content_type()
+                    if content_type == 'text/plain':
                         body = part.get_payload(decode=True).decode('utf-8', errors='replace')
                         break
-                    elif part.get_content_type() == 'text/html' and not body:
-                        html_content = part.get_payload(decode=True).decode('utf-8', errors='replace')
-                        if HAS_BS4:
-                            soup = BeautifulSoup(html_content, 'html.parser')
+                    if content_type == 'text/html' and html_part is None:
+                        html_part = part
+                else:
+                    # Only parse HTML when no plain-text alternative exists
+                    if html_part is not None:
+                        html_content = html_part.get_payload(decode=True).decode('utf-8', errors='replace')
+                        bs4 = _lazy_import('bs4')
+                        if bs4 is not None:
+                            soup = bs4.BeautifulSoup(html_content, BS_PARSER)
                             body = soup.get_text()
                         else:
                             body = html_content
@@ -234,89 +320,112 @@ class FileParser:
 
     def parse_epub(self, filepath: Path) -> str:
         """Parse EPUB eBook files."""
-        if not HAS_EPUB:
-            return f"[EPUB: {filepath.name}] - EPUB parsing requires ebooklib"
-
         try:
-            book = epub.read_epub(filepath)
-            text_parts = []
-
-            # Get book metadata
-            title = book.get_metadata('DC', 'title')
-            author = book.get_metadata('DC', 'creator')
-
-            if title:
-                text_parts.append(f"Title: {title[0][0]}")
-            if author:
-                text_parts.append(f"Author: {author[0][0]}")
-            text_parts.append("\n---\n")
-
-            # Extract text from all items
-            for item in book.get_items():
-                if item.get_type() == ebooklib.ITEM_DOCUMENT:
-                    content = item.get_content().decode('utf-8', errors='replace')
-                    if HAS_BS4:
-                        soup = BeautifulSoup(content, 'html.parser')
-                        text = soup.get_text()
-                        if text.strip():
-                            text_parts.append(text)
-                    else:
-                        text_parts.append(content)
-
-            return '\n\n'.join(text_parts)
+            return ''.join(self.parse_epub_stream(filepath))
         except Exception as e:
             return f"[EPUB Error: {e}]"
 
+    def parse_epub_stream(self, filepath: Path) -> Iterator[str]:
+        """
+        Yield an EPUB's text piece by piece (metadata, then one piece per chapter).
+
+        Concatenating the pieces gives ``parse_epub``'s text; consumers that can
+        work incrementally only ever hold one chapter at a time.
+        """
+        ebooklib = _lazy_import('ebooklib')
+        epub = _lazy_import('ebooklib.epub') if ebooklib else None
+        if epub is None:
+            yield f"[EPUB: {filepath.name}] - EPUB parsing requires ebooklib"
+            return
+
+        book = epub.read_epub(filepath)
+
+        # Get book metadata
+        title = book.get_metadata('DC', 'title')
+        author = book.get_metadata('DC', 'creator')
+
+        header = []
+        if title:
+            header.append(f"Title: {title[0][0]}")
+        if author:
+            header.append(f"Author: {author[0][0]}")
+        header.append("\n---\n")
+        yield '\n\n'.join(header)
+
+        # Extract text from all document items
+        bs4 = _lazy_import('bs4')
+        for item in book.get_items_of_type(ebooklib.ITEM_DOCUMENT):
+            content = item.get_content().decode('utf-8', errors='replace')
+            if bs4 is not None:
+                soup = bs4.BeautifulSoup(content, BS_PARSER)
+                text = soup.get_text()
+                # Break the tree's reference cycles now rather than at the next GC pass
+                soup.decompose()
+                if text.strip():
+                    yield '\n\n' + text
+            else:
+                yield '\n\n' + content
+
     def parse_html(self, filepath: Path) -> str:
         """Parse HTML files."""
         content = self.parse_text(filepath)
 
-        if HAS_BS4:
+        text = None
+        lxml_html = _lazy_import('lxml.html')
+        if lxml_html is not None:
+            try:
+                # Tree walk and text concatenation both stay inside libxml2
+                root = lxml_html.fromstring(content)
+                for element in list(root.iter('script', 'style')):
+                    element.drop_tree()
+                text = root.text_content()
+            except Exception:
+                text = None
+
+        bs4 = _lazy_import('bs4') if text is None else None
+        if bs4 is not None:
             try:
-                soup = BeautifulSoup(content, 'html.parser')
+                soup = bs4.BeautifulSoup(content, BS_PARSER)
 
                 # Remove script and style elements
                 for script in soup(["script", "style"]):
                     script.decompose()
 
-                # Get text
                 text = soup.get_text()
-
-                # Break into lines and remove leading/trailing space
-                lines = (line.strip() for line in text.splitlines())
-                # Break multi-headlines into a line each
-                chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-                # Drop blank lines
-                text = '\n'.join(chunk for chunk in chunks if chunk)
-
-                return text
             except Exception:
-                return content
-        else:
+                text = None
+
+        if text is None:
             return content
 
+        # Strip each line and drop blank ones
+        return '\n'.join(filter(None, (line.strip() for line in text.splitlines())))
+
     def parse_json(self, filepath: Path) -> str:
         """Parse JSON files into readable text."""
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-            # Pretty print the JSON
-            return json.dumps(data, indent=2, ensure_ascii=False)
-        except Exception as e:
+            non_finite = []
+            data = json.loads(Path(filepath).read_bytes(), parse_constant=lambda c: non_finite.append(c) or float(c))
+        except Exception:
             # If JSON parsing fails, treat as text
             return self.parse_text(filepath)
 
+        # Pretty print the JSON. json.dumps(indent=...) runs in pure Python, so let
+        # orjson do it; it would write NaN/Infinity as null and rejects integers
+        # beyond 64 bits, so those documents keep the json encoder.
+        if not non_finite:
+            try:
+                return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode('utf-8')
+            except orjson.JSONEncodeError:
+                pass
+        return json.dumps(data, indent=2, ensure_ascii=False)
+
     def parse_csv(self, filepath: Path) -> str:
         """Parse CSV files into readable text."""
         try:
-            rows = []
-            with open(filepath, 'r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                for row in reader:
-                    rows.append(' | '.join(row))
-
-            return '\n'.join(rows)
+            # Large read buffer: CSV files are read sequentially end to end
+            with open(filepath, 'r', encoding='utf-8', buffering=1 << 20) as f:
+                return '\n'.join(' | '.join(row) for row in csv.reader(f))
         except Exception:
             # If CSV parsing fails, treat as text
             return self.parse_text(filepath)
@@ -354,35 +463,70 @@ def scan_directory(directory: str, file_types: List[str] = None,
         # Filter to only supported extensions
         target_extensions = target_extensions & supported_extensions
 
+    # Extensions hold a single dot, so a name matches when its last suffix does
+    wanted = frozenset(ext.lower() for ext in target_extensions)
+
     files = []
+    pending = [str(directory)]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive:
+                                pending.append(entry.path)
+                        else:
+                            _, dot, ext = entry.name.rpartition('.')
+                            if dot and f'.{ext.lower()}' in wanted and entry.is_file():
+                                files.append(entry.path)
+                    except OSError:
+                        continue
+        except PermissionError:
+            continue
 
-    if recursive:
-        for ext in target_extensions:
-            pattern = f"**/*{ext}"
-            files.extend(str(p) for p in directory.glob(pattern) if p.is_file())
-    else:
-        for ext in target_extensions:
-            pattern = f"*{ext}"
-            files.extend(str(p) for p in directory.glob(pattern) if p.is_file())
+    return sorted(files)
+
+
+# Per-process FileParser used by parse_directory workers
+_worker_parser = None
 
-    return sorted(set(files))  # Remove duplicates and sort
+
+def _init_parse_worker(cache_dir: Optional[Path]) -> None:
+    global _worker_parser
+    _worker_parser = FileParser(cache_dir=cache_dir)
+
+
+def _parse_one(filepath: str) -> Optional[Dict[str, str]]:
+    global _worker_parser
+    if _worker_parser is None:
+        _worker_parser = FileParser()
+    return _worker_parser.parse_file(filepath)
 
 
 def parse_directory(directory: str, file_types: List[str] = None,
-                   recursive: bool = True) -> List[Dict]:
+                   recursive: bool = True, max_workers: Optional[int] = None,
+                   cache_dir: Optional[Path] = None) -> List[Dict]:
     """
     Parse all supported files in a directory.
 
+    Files are parsed across a process pool (``max_workers`` defaults to the CPU
+    count); a handful of files, or a single worker, is parsed inline. With
+    ``cache_dir`` set, every parser (inline or in a worker) reads and writes
+    the on-disk parse cache there.
+
     Returns:
         List of parsed documents with content and metadata
     """
     files = scan_directory(directory, file_types, recursive)
-    parser = FileParser()
+    workers = min(max_workers or os.cpu_count() or 1, len(files))
 
-    results = []
-    for filepath in files:
-        result = parser.parse_file(filepath)
-        if result and result.get('content'):
-            results.append(result)
+    if len(files) < 4 or workers <= 1:
+        parser = FileParser(cache_dir=cache_dir)
+        parsed = map(parser.parse_file, files)
+        return [result for result in parsed if result and result.get('content')]
 
-    return results
\ No newline at end of file
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_parse_worker,
+                             initargs=(cache_dir,)) as pool:
+        parsed = pool.map(_parse_one, files, chunksize=8)
+        return [result for result in parsed if result and result.get('content')]
@@ -1,3 +1,8 @@
+import re
+
+_LEADING_WS = re.compile(r'\s*')
+_NON_WS = re.compile(r'\S')
+
 DOCS_ONLY_SYSTEM = """You are a meticulous documentation expert.
 You MUST answer only using the provided passages.
 - If an answer is not supported, reply exactly: "Not found in the provided documentation."
@@ -5,14 +10,23 @@ You MUST answer only using the provided passages.
 - Prefer exact parameter names, defaults, code blocks, and headings as quoted evidence.
 - Be concise and technical. Do not invent details beyond the passages."""
 
+def clip_passage(passage: str, limit: int) -> str:
+    """
+    Same as stripping ``passage`` and cutting it to ``limit`` chars plus " ...",
+    but only the kept prefix is copied, never the discarded tail.
+    """
+    start = _LEADING_WS.match(passage).end()
+    end = start + limit
+    if _NON_WS.search(passage, end):
+        return passage[start:end] + " ..."
+    return passage[start:end].rstrip()
+
 def build_prompt(question: str, passages: list[str]):
     # Create a numbered citation table the model can reference.
     cites = []
     for i, p in enumerate(passages, 1):
         # Trim long passages to keep the prompt efficient
-        text = p.strip()
-        if len(text) > 1500:
-            text = text[:1500] + " ..."
+        text = clip_passage(p, 1500)
         cites.append(f"[{i}] {text}")
     cite_block = "\n".join(cites) if cites else "[1] No passages provided."
     return f"""{DOCS_ONLY_SYSTEM}
@@ -3,6 +3,12 @@ SUPERCHARGED PROMPT ENGINEERING
 Make our local AI a comprehensive, thoughtful expert that goes above and beyond
 """
 
+import re
+from functools import lru_cache
+from types import MappingProxyType
+
+from .prompts import clip_passage
+
 # The original restrictive prompt (for comparison/fallback)
 DOCS_ONLY_BASIC = """You are a meticulous documentation expert.
 You MUST answer only using the provided passages.
@@ -88,6 +94,53 @@ TEACHING_EXPERT = """You are an INSPIRING TECHNICAL EDUCATOR who makes complex c
 
 Make the user feel CONFIDENT and CAPABLE. Transform documentation into UNDERSTANDING."""
 
+def _keywords(*words: str) -> re.Pattern:
+    """One alternation for a keyword group; matches anywhere, like ``word in text``."""
+    return re.compile("|".join(re.escape(word) for word in words))
+
+# Expert persona per prompt mode
+_PROMPTS = MappingProxyType({
+    "comprehensive": DOCS_EXPERT_COMPREHENSIVE,
+    "integration": INTEGRATION_EXPERT,
+    "debugging": DEBUGGING_EXPERT,
+    "learning": TEACHING_EXPERT,
+    "basic": DOCS_ONLY_BASIC
+})
+
+# Keyword groups that auto-select a persona in "comprehensive" mode, first match wins
+_MODE_PATTERNS = (
+    (_keywords("implement", "integrate", "build", "create", "setup"), INTEGRATION_EXPERT),
+    (_keywords("error", "fail", "issue", "problem", "fix", "debug"), DEBUGGING_EXPERT),
+    (_keywords("what is", "how does", "explain", "understanding", "learn"), TEACHING_EXPERT),
+)
+
+@lru_cache(maxsize=4096)
+def _select_system_prompt(question: str, mode: str) -> str:
+    """Pick the expert persona for ``mode``, auto-selecting one for 'comprehensive'."""
+    system_prompt = _PROMPTS.get(mode, DOCS_EXPERT_COMPREHENSIVE)
+
+    # Analyze question to auto-select best mode if not specified
+    if mode == "comprehensive":
+        question_lower = question.lower()
+        for pattern, prompt in _MODE_PATTERNS:
+            if pattern.search(question_lower):
+                system_prompt = prompt
+                break
+
+    return system_prompt
+
+# Passages are large, so keep far fewer of these than of the per-question entries
+@lru_cache(maxsize=64)
+def _build_cite_block(passages: tuple[str, ...]) -> str:
+    """Create enhanced citation table with context"""
+    cites = []
+    for i, p in enumerate(passages, 1):
+        # Don't truncate as aggressively - we want context!
+        text = clip_passage(p, 2500)
+        cites.append(f"[{i}] {text}")
+
+    return "\n".join(cites) if cites else "[1] No passages provided."
+
 def build_supercharged_prompt(question: str, passages: list[str], mode: str = "comprehensive"):
     """
     Build a supercharged prompt that encourages comprehensive, thoughtful responses
@@ -100,37 +153,8 @@ def build_supercharged_prompt(question: str, passages: list[str], mode: str = "c
     - basic: Original restrictive mode (fallback)
     """
 
-    # Select the appropriate expert persona
-    prompts = {
-        "comprehensive": DOCS_EXPERT_COMPREHENSIVE,
-        "integration": INTEGRATION_EXPERT,
-        "debugging": DEBUGGING_EXPERT,
-        "learning": TEACHING_EXPERT,
-        "basic": DOCS_ONLY_BASIC
-    }
-
-    system_prompt = prompts.get(mode, DOCS_EXPERT_COMPREHENSIVE)
-
-    # Analyze question to auto-select best mode if not specified
-    if mode == "comprehensive":
-        question_lower = question.lower()
-        if any(word in question_lower for word in ["implement", "integrate", "build", "create", "setup"]):
-            system_prompt = INTEGRATION_EXPERT
-        elif any(word in question_lower for word in ["error", "fail", "issue", "problem", "fix", "debug"]):
-            system_prompt = DEBUGGING_EXPERT
-        elif any(word in question_lower for word in ["what is", "how does", "explain", "understanding", "learn"]):
-            system_prompt = TEACHING_EXPERT
-
-    # Create enhanced citation table with context
-    cites = []
-    for i, p in enumerate(passages, 1):
-        text = p.strip()
-        # Don't truncate as aggressively - we want context!
-        if len(text) > 2500:
-            text = text[:2500] + " ..."
-        cites.append(f"[{i}] {text}")
-
-    cite_block = "\n".join(cites) if cites else "[1] No passages provided."
+    system_prompt = _select_system_prompt(question, mode)
+    cite_block = _build_cite_block(tuple(passages))
 
     # Enhance the question with implicit context
     enhanced_question = analyze_question_intent(question)
@@ -152,47 +176,39 @@ def build_supercharged_prompt(question: str, passages: list[str], mode: str = "c
 
 """
 
+# Question keywords -> intent notes, checked in order
+_INTENT_PATTERNS = (
+    (_keywords("how do i", "how to", "implement", "create", "build"),
+     "💡 User Intent: Needs implementation guidance and practical steps"),
+    (_keywords("difference", "vs", "versus", "better", "should i"),
+     "💡 User Intent: Needs comparison and decision guidance"),
+    (_keywords("error", "wrong", "fail", "issue", "problem"),
+     "💡 User Intent: Troubleshooting an issue - provide diagnostics"),
+    (_keywords("what", "why", "explain", "understanding"),
+     "💡 User Intent: Learning mode - provide education and context"),
+    (_keywords("best", "optimize", "improve", "performance", "efficient"),
+     "💡 User Intent: Wants best practices and optimization strategies"),
+)
+
+# Question keywords -> implicit considerations (payments, APIs, frontend)
+_IMPLICIT_PATTERNS = (
+    (_keywords("payment", "charge", "billing", "subscription"),
+     "Consider: Security, PCI compliance, error handling, testing"),
+    (_keywords("api", "endpoint", "webhook", "request"),
+     "Consider: Authentication, rate limiting, retries, error codes"),
+    (_keywords("frontend", "javascript", "element", "form", "ui"),
+     "Consider: User experience, validation, loading states, accessibility"),
+)
+
+@lru_cache(maxsize=4096)
 def analyze_question_intent(question: str) -> str:
     """
     Analyze the question to understand implicit needs and add context
     """
-    intents = []
     question_lower = question.lower()
 
-    # Detect integration intent
-    if any(word in question_lower for word in ["how do i", "how to", "implement", "create", "build"]):
-        intents.append("💡 User Intent: Needs implementation guidance and practical steps")
-
-    # Detect comparison intent
-    if any(word in question_lower for word in ["difference", "vs", "versus", "better", "should i"]):
-        intents.append("💡 User Intent: Needs comparison and decision guidance")
-
-    # Detect debugging intent
-    if any(word in question_lower for word in ["error", "wrong", "fail", "issue", "problem"]):
-        intents.append("💡 User Intent: Troubleshooting an issue - provide diagnostics")
-
-    # Detect learning intent
-    if any(word in question_lower for word in ["what", "why", "explain", "understanding"]):
-        intents.append("💡 User Intent: Learning mode - provide education and context")
-
-    # Detect optimization intent
-    if any(word in question_lower for word in ["best", "optimize", "improve", "performance", "efficient"]):
-        intents.append("💡 User Intent: Wants best practices and optimization strategies")
-
-    # Add implicit considerations
-    implicit = []
-
-    # Payment-related
-    if any(word in question_lower for word in ["payment", "charge", "billing", "subscription"]):
-        implicit.append("Consider: Security, PCI compliance, error handling, testing")
-
-    # API-related
-    if any(word in question_lower for word in ["api", "endpoint", "webhook", "request"]):
-        implicit.append("Consider: Authentication, rate limiting, retries, error codes")
-
-    # Frontend-related
-    if any(word in question_lower for word in ["frontend", "javascript", "element", "form", "ui"]):
-        implicit.append("Consider: User experience, validation, loading states, accessibility")
+    intents = [note for pattern, note in _INTENT_PATTERNS if pattern.search(question_lower)]
+    implicit = [note for pattern, note in _IMPLICIT_PATTERNS if pattern.search(question_lower)]
 
     # Add context to prompt
     context = ""
@@ -215,9 +231,7 @@ def build_prompt(question: str, passages: list[str], supercharged: bool = True):
         # Original implementation for backwards compatibility
         cites = []
         for i, p in enumerate(passages, 1):
-            text = p.strip()
-            if len(text) > 1500:
-                text = text[:1500] + " ..."
+            text = clip_passage(p, 1500)
             cites.append(f"[{i}] {text}")
         cite_block = "\n".join(cites) if cites else "[1] No passages provided."
 
@@ -3,15 +3,108 @@ Incremental Update System with Change Detection
 Only updates what has actually changed - no full DB recreation
 """
 
+import atexit
 import hashlib
 import json
+import multiprocessing
+import os
+import re
 import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Tuple, Optional
 import requests
 from bs4 import BeautifulSoup
 
+# Upper bound on concurrent requests during a change scan
+SCAN_CONCURRENCY = 32
+
+# URLs scanned and updated together by run_incremental_update; bounds how
+# many fetched pages are held in memory at once
+SCAN_WINDOW = 256
+
+# Common dynamic patterns stripped before hashing. Applied one after another:
+# a single alternation measured slower on typical pages, and removing one
+# pattern can expose a match for a later one.
+_DYNAMIC_CONTENT_RES = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}',  # ISO timestamps
+    r'generated on .+',  # Generation timestamps
+    r'last updated: .+',  # Update timestamps
+    r'<!--.*?-->',  # HTML comments
+    r'data-timestamp="[^"]*"',  # Data attributes with timestamps
+    r'id="[a-f0-9]{8,}"',  # Generated IDs
+))
+
+# URLs per IN (...) list when preloading metadata, under SQLite's variable limit
+_PRELOAD_BATCH = 500
+
+# Pages at least this long are hashed in a worker process during scans
+_HASH_OFFLOAD_CHARS = 1 << 16
+
+# Chunks buffered across documents before one Chroma delete + upsert
+UPSERT_FLUSH_CHUNKS = 512
+
+# Characters per encoded slice when hashing large documents
+_HASH_SLICE = 1 << 16
+
+# Applied once to the long-lived metadata connection. auto_vacuum only takes
+# effect on a freshly created database, so it has to come first.
+_SQLITE_PRAGMAS = (
+    "PRAGMA auto_vacuum=INCREMENTAL",
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA journal_size_limit=67108864",
+)
+
+def _remove_dynamic_content(content: str) -> str:
+    """Remove dynamic content that shouldn't trigger updates"""
+    for pattern in _DYNAMIC_CONTENT_RES:
+        content = pattern.sub('', content)
+
+    return content
+
+
+def _content_hash(content: str) -> str:
+    """Stable hash of page content, ignoring case and dynamic fragments"""
+    # Normalize content for consistent hashing
+    normalized = content.strip().lower()
+    # Remove timestamps and dynamic content that changes but doesn't matter
+    normalized = _remove_dynamic_content(normalized)
+    if len(normalized) <= _HASH_SLICE:
+        return hashlib.sha256(normalized.encode()).hexdigest()
+    # UTF-8 encodes each code point independently, so hashing encoded
+    # slices yields the same digest without a full-size bytes copy
+    h = hashlib.sha256()
+    for start in range(0, len(normalized), _HASH_SLICE):
+        h.update(normalized[start:start + _HASH_SLICE].encode())
+    return h.hexdigest()
+
+
+@lru_cache(maxsize=4)
+def _get_embedder(model_name: str):
+    """Load a SentenceTransformer once per model name"""
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+
+@lru_cache(maxsize=4)
+def _get_chroma_collection(chroma_path: str):
+    """Open the persistent Chroma "docs" collection once per path"""
+    import chromadb
+    from chromadb.config import Settings
+    client = chromadb.Client(Settings(
+        is_persistent=True,
+        persist_directory=chroma_path
+    ))
+    return client.get_or_create_collection(name="docs")
+
+
 class IncrementalUpdater:
     """
     Smart incremental update system that:
@@ -25,11 +118,46 @@ class IncrementalUpdater:
         self.profile_name = profile_name
         self.profile_path = Path(f"profiles/{profile_name}")
         self.metadata_db = self.profile_path / "ingestion_metadata.db"
+        # One connection for the updater's lifetime; scan workers share it,
+        # so statements issued from those threads run under _lock.
+        self._conn = sqlite3.connect(self.metadata_db, check_same_thread=False)
+        self._lock = threading.Lock()
+        # change_log rows buffered by _log_change until flush_changes()
+        self._pending_changes: List[Tuple[str, str, Optional[str], Optional[str]]] = []
+        # Existing document_metadata rows for the URLs of the running scan
+        self._meta_cache: Dict[str, Optional[tuple]] = {}
+        self._hash_executor: Optional[ProcessPoolExecutor] = None
+        # Connection to the profile's embedding cache, opened on first encode
+        self._embedding_cache: Optional[sqlite3.Connection] = None
+        for pragma in _SQLITE_PRAGMAS:
+            self._conn.execute(pragma)
+        # Shared HTTP session: keep-alive connections (and TLS sessions) are
+        # reused across URLs, with a pool sized for the scan's worker threads
+        self._http = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=SCAN_CONCURRENCY,
+                                                pool_maxsize=SCAN_CONCURRENCY)
+        self._http.mount("http://", adapter)
+        self._http.mount("https://", adapter)
+        atexit.register(self.close)
         self.init_metadata_db()
 
+    def close(self):
+        """Release the HTTP session, hash workers and database connections"""
+        self._http.close()
+        with self._lock:
+            if self._hash_executor is not None:
+                self._hash_executor.shutdown()
+                self._hash_executor = None
+            if self._embedding_cache is not None:
+                self._embedding_cache.close()
+                self._embedding_cache = None
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
     def init_metadata_db(self):
         """Initialize metadata database for tracking changes"""
-        conn = sqlite3.connect(self.metadata_db)
+        conn = self._conn
         cursor = conn.cursor()
 
         # Create tables for tracking
@@ -75,50 +203,60 @@ class IncrementalUpdater:
             )
         """)
 
+        # Chunk ids owned by each document; the primary key also serves
+        # lookups by url. Supersedes the legacy document_metadata.chunk_ids
+        # JSON column, which is only read for documents not yet migrated.
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS doc_chunks (
+                url TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                chunk_index INTEGER,
+                PRIMARY KEY (url, chunk_id)
+            ) WITHOUT ROWID
+        """)
+
+        # Indexes for smart_crawl_schedule and get_update_stats
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_changelog_url_time ON change_log(url, detected_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_changelog_time ON change_log(detected_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_metadata_status ON document_metadata(status)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_metadata_frequency ON document_metadata(change_frequency)")
+
         conn.commit()
-        conn.close()
 
     def calculate_content_hash(self, content: str) -> str:
         """Calculate stable hash of content"""
-        # Normalize content for consistent hashing
-        normalized = content.strip().lower()
-        # Remove timestamps and dynamic content that changes but doesn't matter
-        normalized = self._remove_dynamic_content(normalized)
-        return hashlib.sha256(normalized.encode()).hexdigest()
+        return _content_hash(content)
 
     def _remove_dynamic_content(self, content: str) -> str:
         """Remove dynamic content that shouldn't trigger updates"""
-        import re
-
-        # Remove common dynamic patterns
-        patterns = [
-            r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}',  # ISO timestamps
-            r'generated on .+',  # Generation timestamps
-            r'last updated: .+',  # Update timestamps
-            r'<!--.*?-->',  # HTML comments
-            r'data-timestamp="[^"]*"',  # Data attributes with timestamps
-            r'id="[a-f0-9]{8,}"',  # Generated IDs
-        ]
-
-        for pattern in patterns:
-            content = re.sub(pattern, '', content, flags=re.IGNORECASE)
-
-        return content
+        return _remove_dynamic_content(content)
+
+    def _hash_pool(self) -> ProcessPoolExecutor:
+        """Process pool for hashing large pages, started on first use"""
+        with self._lock:
+            if self._hash_executor is None:
+                # Spawned, not forked: this runs on a scan thread while other
+                # threads are mid-request, and fork copies their held locks
+                self._hash_executor = ProcessPoolExecutor(
+                    max_workers=max(1, (os.cpu_count() or 2) // 2),
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._hash_executor
 
     def check_url_changes(self, url: str) -> Dict[str, any]:
         """
         Check if a URL has changed using multiple methods
         Returns change detection results
         """
-        conn = sqlite3.connect(self.metadata_db)
-        cursor = conn.cursor()
-
-        # Get existing metadata
-        cursor.execute(
-            "SELECT content_hash, last_modified, etag, content_length FROM document_metadata WHERE url = ?",
-            (url,)
-        )
-        existing = cursor.fetchone()
+        # Get existing metadata (preloaded by scan_for_changes when scanning)
+        if url in self._meta_cache:
+            existing = self._meta_cache[url]
+        else:
+            with self._lock:
+                existing = self._conn.execute(
+                    "SELECT content_hash, last_modified, etag, content_length FROM document_metadata WHERE url = ?",
+                    (url,)
+                ).fetchone()
 
         changes = {
             'url': url,
@@ -129,102 +267,144 @@ class IncrementalUpdater:
         }
 
         try:
-            # Make HEAD request first (faster)
-            head_response = requests.head(url, timeout=10, allow_redirects=True)
-            headers = head_response.headers
-
-            # Check multiple signals
-            signals = []
-
-            # 1. ETag check (most reliable)
-            current_etag = headers.get('ETag')
-            if existing and current_etag:
-                if current_etag != existing[2]:  # etag column
-                    signals.append(('etag', 0.9))
-
-            # 2. Last-Modified check
-            current_modified = headers.get('Last-Modified')
-            if existing and current_modified:
-                if current_modified != existing[1]:  # last_modified column
-                    signals.append(('last_modified', 0.8))
-
-            # 3. Content-Length check (less reliable)
-            current_length = headers.get('Content-Length')
-            if existing and current_length:
-                if int(current_length) != existing[3]:  # content_length column
-                    signals.append(('content_length', 0.5))
-
-            # If we have signals or it's new, fetch content
-            if signals or changes['is_new']:
-                response = requests.get(url, timeout=30)
-                content = response.text
+            # One conditional GET instead of HEAD + GET: when the stored
+            # validators still match, the server answers 304 with no body.
+            conditional = {}
+            if existing:
+                if existing[2]:
+                    conditional['If-None-Match'] = existing[2]
+                if existing[1]:
+                    conditional['If-Modified-Since'] = existing[1]
+            with self._http.get(url, headers=conditional, timeout=30, stream=True) as response:
+                if response.status_code == 304:
+                    return changes
+                headers = response.headers
+
+                # Check multiple signals
+                signals = []
+
+                # 1. ETag check (most reliable)
+                current_etag = headers.get('ETag')
+                if existing and current_etag:
+                    if current_etag != existing[2]:  # etag column
+                        signals.append(('etag', 0.9))
+
+                # 2. Last-Modified check
+                current_modified = headers.get('Last-Modified')
+                if existing and current_modified:
+                    if current_modified != existing[1]:  # last_modified column
+                        signals.append(('last_modified', 0.8))
+
+                # 3. Content-Length check (less reliable)
+                current_length = headers.get('Content-Length')
+                if existing and current_length:
+                    if int(current_length) != existing[3]:  # content_length column
+                        signals.append(('content_length', 0.5))
+
+                # Matching validators identify the same representation even
+                # when the server ignored the conditional headers, so the
+                # body is neither downloaded nor re-hashed
+                if existing and (
+                    (current_etag and current_etag == existing[2])
+                    or (current_modified and current_modified == existing[1]
+                        and current_length and int(current_length) == existing[3])
+                ):
+                    return changes
+
+                # Read the body in large blocks and decode it once, straight
+                # from the buffer, rather than via response.content + .text
+                body = bytearray()
+                for block in response.iter_content(chunk_size=_HASH_SLICE):
+                    body += block
+                try:
+                    content = str(body, response.encoding or 'utf-8', 'replace')
+                except LookupError:
+                    content = str(body, 'utf-8', 'replace')
+                del body
+            # The regex passes hold the GIL, so large pages are hashed in a
+            # worker process to keep the other scan threads moving; below
+            # the threshold the pickling round trip costs more than it saves
+            if len(content) >= _HASH_OFFLOAD_CHARS:
+                current_hash = self._hash_pool().submit(_content_hash, content).result()
+            else:
                 current_hash = self.calculate_content_hash(content)
 
-                if existing:
-                    if current_hash != existing[0]:  # content_hash column
-                        signals.append(('content_hash', 1.0))
-                        changes['has_changed'] = True
-                        changes['old_hash'] = existing[0]
-                        changes['new_hash'] = current_hash
-                    else:
-                        # Content unchanged despite header changes
-                        changes['has_changed'] = False
-                else:
+            if existing:
+                if current_hash != existing[0]:  # content_hash column
+                    signals.append(('content_hash', 1.0))
                     changes['has_changed'] = True
+                    changes['old_hash'] = existing[0]
                     changes['new_hash'] = current_hash
-
-                # Calculate confidence
-                if signals:
-                    changes['confidence'] = max(s[1] for s in signals)
-                    changes['signals'] = [s[0] for s in signals]
-
-                # Store the new metadata
-                changes['metadata'] = {
-                    'content_hash': current_hash,
-                    'last_modified': current_modified,
-                    'etag': current_etag,
-                    'content_length': int(current_length) if current_length else None,
-                    'content': content
-                }
+                else:
+                    # Content unchanged despite header changes
+                    changes['has_changed'] = False
+            else:
+                changes['has_changed'] = True
+                changes['new_hash'] = current_hash
+
+            # Calculate confidence
+            if signals:
+                changes['confidence'] = max(s[1] for s in signals)
+                changes['signals'] = [s[0] for s in signals]
+
+            # Store the new metadata
+            changes['metadata'] = {
+                'content_hash': current_hash,
+                'last_modified': current_modified,
+                'etag': current_etag,
+                'content_length': int(current_length) if current_length else None,
+                'content': content
+            }
 
         except Exception as e:
             changes['error'] = str(e)
             changes['has_changed'] = None  # Unknown
 
-        conn.close()
         return changes
 
     def scan_for_changes(self, urls: List[str]) -> Dict[str, List[str]]:
         """
         Scan multiple URLs for changes
-        Returns categorized lists of URLs
+        Returns categorized lists of URLs, plus 'detail': the change info
+        (including fetched content) of every new or updated URL
         """
         results = {
             'unchanged': [],
             'updated': [],
             'new': [],
-            'errors': []
+            'errors': [],
+            'detail': {}
         }
 
         total = len(urls)
         print(f"[CHANGE DETECTION] Scanning {total} URLs for changes...")
+        self._preload_metadata(urls)
+
+        # The checks are network-bound, so fan them out over a thread pool;
+        # map() keeps results in input order for the classification below.
+        workers = max(1, min(SCAN_CONCURRENCY, total))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            checked = pool.map(self.check_url_changes, urls)
+
+            for i, (url, change_info) in enumerate(zip(urls, checked), 1):
+                if i % 10 == 0:
+                    print(f"[PROGRESS] Checked {i}/{total} URLs...")
+
+                if change_info.get('error'):
+                    results['errors'].append(url)
+                elif change_info['is_new']:
+                    results['new'].append(url)
+                    results['detail'][url] = change_info
+                elif change_info['has_changed']:
+                    results['updated'].append(url)
+                    results['detail'][url] = change_info
+                    # Log the change
+                    self._log_change(url, 'content', change_info.get('old_hash'), change_info.get('new_hash'))
+                else:
+                    results['unchanged'].append(url)
 
-        for i, url in enumerate(urls, 1):
-            if i % 10 == 0:
-                print(f"[PROGRESS] Checked {i}/{total} URLs...")
-
-            change_info = self.check_url_changes(url)
-
-            if change_info.get('error'):
-                results['errors'].append(url)
-            elif change_info['is_new']:
-                results['new'].append(url)
-            elif change_info['has_changed']:
-                results['updated'].append(url)
-                # Log the change
-                self._log_change(url, 'content', change_info.get('old_hash'), change_info.get('new_hash'))
-            else:
-                results['unchanged'].append(url)
+        self.flush_changes()
+        self._meta_cache = {}
 
         # Summary
         print(f"\n[CHANGE DETECTION] Summary:")
@@ -235,18 +415,36 @@ class IncrementalUpdater:
 
         return results
 
-    def _log_change(self, url: str, change_type: str, old_hash: str = None, new_hash: str = None):
-        """Log detected changes"""
-        conn = sqlite3.connect(self.metadata_db)
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            INSERT INTO change_log (url, detected_at, change_type, old_hash, new_hash)
-            VALUES (?, datetime('now'), ?, ?, ?)
-        """, (url, change_type, old_hash, new_hash))
+    def _preload_metadata(self, urls: List[str]):
+        """Load existing metadata rows for urls in a few IN (...) queries"""
+        cache: Dict[str, Optional[tuple]] = dict.fromkeys(urls)
+        unique = list(cache)
+        with self._lock:
+            for start in range(0, len(unique), _PRELOAD_BATCH):
+                batch = unique[start:start + _PRELOAD_BATCH]
+                rows = self._conn.execute(
+                    "SELECT url, content_hash, last_modified, etag, content_length "
+                    f"FROM document_metadata WHERE url IN ({','.join('?' * len(batch))})",
+                    batch
+                )
+                for url, *row in rows:
+                    cache[url] = tuple(row)
+        self._meta_cache = cache
 
-        conn.commit()
-        conn.close()
+    def _log_change(self, url: str, change_type: str, old_hash: str = None, new_hash: str = None):
+        """Queue a detected change; written on the next flush_changes()"""
+        self._pending_changes.append((url, change_type, old_hash, new_hash))
+
+    def flush_changes(self):
+        """Write all queued change_log rows in a single transaction"""
+        if not self._pending_changes:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany("""
+                INSERT INTO change_log (url, detected_at, change_type, old_hash, new_hash)
+                VALUES (?, datetime('now'), ?, ?, ?)
+            """, self._pending_changes)
+        self._pending_changes.clear()
 
     def update_only_changed(self, change_results: Dict[str, List[str]], config: Dict) -> Dict[str, any]:
         """
@@ -254,9 +452,6 @@ class IncrementalUpdater:
         Preserves unchanged content
         """
         from .retriever.ingest import _chunk, _hash, _html_to_md
-        from sentence_transformers import SentenceTransformer
-        import chromadb
-        from chromadb.config import Settings
 
         stats = {
             'updated_chunks': 0,
@@ -266,19 +461,46 @@ class IncrementalUpdater:
             'errors': []
         }
 
-        # Initialize ChromaDB
+        # ChromaDB collection and embedder are cached across updates
         chroma_path = self.profile_path / "data" / "chroma"
-        client = chromadb.Client(Settings(
-            is_persistent=True,
-            persist_directory=str(chroma_path)
-        ))
-        coll = client.get_or_create_collection(name="docs")
-
-        # Initialize embedder
-        embedder = SentenceTransformer(config["model"]["embedding"]["hf_name"])
+        coll = _get_chroma_collection(str(chroma_path))
+        model_name = config["model"]["embedding"]["hf_name"]
+        embedder = _get_embedder(model_name)
 
-        conn = sqlite3.connect(self.metadata_db)
+        conn = self._conn
         cursor = conn.cursor()
+        metadata_updates = []
+        chunk_rows = []
+
+        # Chroma writes are buffered across documents and flushed together:
+        # old chunk ids are deleted first, since an unchanged chunk keeps its id
+        pending = {'urls': [], 'delete': [], 'ids': [], 'docs': [], 'metas': [], 'rows': [], 'chunk_rows': []}
+
+        def flush():
+            if not pending['urls']:
+                return
+            try:
+                if pending['delete']:
+                    coll.delete(ids=pending['delete'])
+                if pending['ids']:
+                    # Chroma keeps float32 vectors; hand it the float32 array
+                    # as-is instead of boxing every value via .tolist()
+                    embeddings = self._encode_cached(embedder, model_name, pending['docs'])
+                    coll.upsert(
+                        ids=pending['ids'],
+                        documents=pending['docs'],
+                        metadatas=pending['metas'],
+                        embeddings=embeddings
+                    )
+                stats['deleted_chunks'] += len(pending['delete'])
+                stats['updated_chunks'] += len(pending['ids'])
+                metadata_updates.extend(pending['rows'])
+                chunk_rows.extend(pending['chunk_rows'])
+            except Exception as e:
+                print(f"  Error writing {len(pending['urls'])} documents to ChromaDB: {e}")
+                stats['errors'].extend(f"{url}: {str(e)}" for url in pending['urls'])
+            for buf in pending.values():
+                buf.clear()
 
         # Process updated documents
         for url in change_results['updated']:
@@ -286,62 +508,63 @@ class IncrementalUpdater:
                 print(f"[UPDATE] Processing changed document: {url}")
 
                 # Get old chunk IDs to delete
-                cursor.execute(
-                    "SELECT chunk_ids FROM document_metadata WHERE url = ?",
+                old_chunk_ids = [row[0] for row in cursor.execute(
+                    "SELECT chunk_id FROM doc_chunks WHERE url = ?",
                     (url,)
-                )
-                result = cursor.fetchone()
-                if result and result[0]:
-                    old_chunk_ids = json.loads(result[0])
-                    # Delete old chunks
-                    coll.delete(ids=old_chunk_ids)
-                    stats['deleted_chunks'] += len(old_chunk_ids)
-                    print(f"  Deleted {len(old_chunk_ids)} old chunks")
-
-                # Get new content
-                change_info = self.check_url_changes(url)
+                )]
+                if not old_chunk_ids:
+                    cursor.execute(
+                        "SELECT chunk_ids FROM document_metadata WHERE url = ?",
+                        (url,)
+                    )
+                    result = cursor.fetchone()
+                    old_chunk_ids = json.loads(result[0]) if result and result[0] else []
+
+                # Reuse the content fetched during the scan, releasing it
+                # from the results once this document has been chunked
+                change_info = change_results.get('detail', {}).pop(url, None)
+                if change_info is None:
+                    change_info = self.check_url_changes(url)
                 if change_info.get('metadata', {}).get('content'):
                     content = _html_to_md(change_info['metadata']['content'])
 
                     # Create new chunks
                     chunks = _chunk(content,
-                                  chunk_tokens=config['ingest']['chunk_tokens'],
-                                  chunk_overlap=config['ingest']['chunk_overlap'])
-
-                    new_chunk_ids = []
-                    for i, chunk_text in enumerate(chunks):
-                        chunk_id = f"{_hash(url)}_{i}_{_hash(chunk_text)[:8]}"
-                        new_chunk_ids.append(chunk_id)
-
-                        # Generate embedding
-                        embedding = embedder.encode([chunk_text], show_progress_bar=False)[0].tolist()
-
-                        # Upsert to ChromaDB
-                        coll.upsert(
-                            ids=[chunk_id],
-                            documents=[chunk_text],
-                            metadatas=[{
-                                'source_url': url,
-                                'chunk_index': i,
-                                'updated_at': datetime.now().isoformat()
-                            }],
-                            embeddings=[embedding]
-                        )
-
-                    stats['updated_chunks'] += len(new_chunk_ids)
-                    print(f"  Created {len(new_chunk_ids)} new chunks")
-
-                    # Update metadata
-                    cursor.execute("""
-                        UPDATE document_metadata
-                        SET content_hash = ?, chunk_ids = ?, last_ingested = datetime('now'), status = 'current'
-                        WHERE url = ?
-                    """, (change_info['new_hash'], json.dumps(new_chunk_ids), url))
+                                  tok=config['ingest']['chunk_tokens'],
+                                  overlap=config['ingest']['chunk_overlap'])
+
+                    url_hash = _hash(url)
+                    new_chunk_ids = [f"{url_hash}_{i}_{_hash(chunk_text)[:8]}"
+                                     for i, chunk_text in enumerate(chunks)]
+                    updated_at = datetime.now().isoformat()
+
+                    pending['urls'].append(url)
+                    pending['delete'].extend(old_chunk_ids)
+                    pending['ids'].extend(new_chunk_ids)
+                    pending['docs'].extend(chunks)
+                    pending['metas'].extend({
+                        'source_url': url,
+                        'chunk_index': i,
+                        'updated_at': updated_at
+                    } for i in range(len(chunks)))
+                    pending['rows'].append((change_info['new_hash'], url))
+                    pending['chunk_rows'].extend(
+                        (url, chunk_id, i) for i, chunk_id in enumerate(new_chunk_ids)
+                    )
+                    print(f"  Replacing {len(old_chunk_ids)} old chunks with {len(new_chunk_ids)} new chunks")
+
+                    if len(pending['ids']) >= UPSERT_FLUSH_CHUNKS:
+                        flush()
+                elif old_chunk_ids:
+                    pending['urls'].append(url)
+                    pending['delete'].extend(old_chunk_ids)
 
             except Exception as e:
                 print(f"  Error updating {url}: {e}")
                 stats['errors'].append(f"{url}: {str(e)}")
 
+        flush()
+
         # Process new documents
         for url in change_results['new']:
             try:
@@ -357,8 +580,20 @@ class IncrementalUpdater:
         total_chunks = coll.count()
         stats['preserved_chunks'] = total_chunks - stats['updated_chunks'] - stats['new_chunks']
 
-        conn.commit()
-        conn.close()
+        with conn:
+            cursor.executemany("""
+                UPDATE document_metadata
+                SET content_hash = ?, chunk_ids = NULL, last_ingested = datetime('now'), status = 'current'
+                WHERE url = ?
+            """, metadata_updates)
+            cursor.executemany(
+                "DELETE FROM doc_chunks WHERE url = ?",
+                [(url,) for _, url in metadata_updates]
+            )
+            cursor.executemany(
+                "INSERT OR IGNORE INTO doc_chunks (url, chunk_id, chunk_index) VALUES (?, ?, ?)",
+                chunk_rows
+            )
 
         print(f"\n[INCREMENTAL UPDATE] Complete:")
         print(f"  • Preserved: {stats['preserved_chunks']} chunks (unchanged)")
@@ -370,12 +605,22 @@ class IncrementalUpdater:
 
         return stats
 
+    def _encode_cached(self, embedder, model_name: str, texts: List[str]):
+        """Embed texts through the profile's embedding cache, shared with full ingestion"""
+        from .ingestion_manager import _open_embedding_cache, _encode_cached
+        from .retriever.ingest import _hash
+
+        if self._embedding_cache is None:
+            self._embedding_cache = _open_embedding_cache(self.profile_path / "cache" / "embeddings.db")
+        chunks = [{'text': text, 'hash': _hash(text)} for text in texts]
+        return _encode_cached(self._embedding_cache, embedder, model_name, chunks)
+
     def smart_crawl_schedule(self) -> List[Tuple[str, str]]:
         """
         Determine crawl priority based on change patterns
         Returns list of (url, priority) tuples
         """
-        conn = sqlite3.connect(self.metadata_db)
+        conn = self._conn
         cursor = conn.cursor()
 
         # Analyze change patterns
@@ -400,20 +645,20 @@ class IncrementalUpdater:
                 patterns[url] = 'monthly'
 
         # Update change frequency in metadata
-        for url, frequency in patterns.items():
-            cursor.execute(
+        with conn:
+            cursor.executemany(
                 "UPDATE document_metadata SET change_frequency = ? WHERE url = ?",
-                (frequency, url)
+                [(frequency, url) for url, frequency in patterns.items()]
             )
 
-        conn.commit()
-        conn.close()
+        # Hand back pages freed by old change_log rows
+        cursor.execute("PRAGMA incremental_vacuum(1000)").fetchall()
 
         return patterns
 
     def get_update_stats(self) -> Dict:
         """Get statistics about updates"""
-        conn = sqlite3.connect(self.metadata_db)
+        conn = self._conn
         cursor = conn.cursor()
 
         stats = {}
@@ -447,7 +692,6 @@ class IncrementalUpdater:
         """)
         stats['change_patterns'] = dict(cursor.fetchall())
 
-        conn.close()
         return stats
 
 
@@ -461,23 +705,28 @@ def run_incremental_update(profile_name: str):
     # This would come from your existing crawler
     urls = []  # TODO: Get from crawler
 
-    # Scan for changes
-    changes = updater.scan_for_changes(urls)
-
-    # Only update what changed
-    if changes['updated'] or changes['new']:
-        print(f"\n[INCREMENTAL UPDATE] Updating {len(changes['updated']) + len(changes['new'])} documents...")
-        # Load config
-        from .config_loader import load_config
-        config = load_config(profile_name)
-
-        # Update only changed content
-        stats = updater.update_only_changed(changes, config)
-
-        return True
-    else:
+    # Scan and update one window of URLs at a time, so only a window's worth
+    # of fetched pages is held in memory instead of every changed page
+    config = None
+    changed = 0
+    for start in range(0, len(urls), SCAN_WINDOW):
+        changes = updater.scan_for_changes(urls[start:start + SCAN_WINDOW])
+
+        # Only update what changed
+        if changes['updated'] or changes['new']:
+            changed += len(changes['updated']) + len(changes['new'])
+            print(f"\n[INCREMENTAL UPDATE] Updating {len(changes['updated']) + len(changes['new'])} documents...")
+            # Load config
+            if config is None:
+                from .config_loader import load_config
+                config = load_config(profile_name)
+
+            # Update only changed content
+            updater.update_only_changed(changes, config)
+
+    if not changed:
         print("\n[INCREMENTAL UPDATE] No changes detected - database is current!")
-        return True
+    return True
 
 
 if __name__ == "__main__":
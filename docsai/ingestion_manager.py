@@ -3,15 +3,366 @@ Ingestion Manager - Handles background ingestion with progress tracking
 """
 
 import asyncio
+import multiprocessing
+import os
+import re
+import sqlite3
 import threading
 import time
+from collections import deque
 from datetime import datetime
+from itertools import islice
 from pathlib import Path
 from typing import Dict, List, Optional, Any
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from enum import Enum
-import json
+import orjson
 import uuid
 
+# Chunks embedded per encode() call during indexing; large enough for
+# length-sorted batching to pay off, small enough to keep progress and
+# cancellation responsive
+EMBED_WINDOW = 4096
+
+# Upper bound on file-processing worker processes; each one holds its own
+# parsers and parsed content, so more rarely pays off on many-core machines
+MAX_FILE_WORKERS = 8
+
+# Minimum seconds between task.current_file updates while processing files
+CURRENT_FILE_INTERVAL = 0.25
+
+# Per-process (FileParser, DocumentIntelligence, SmartChunker) for file workers
+_worker_components = None
+
+
+def _init_file_worker(parse_cache: Path, docint_cache: Path) -> None:
+    global _worker_components
+    from .file_parsers import FileParser
+    from .document_intelligence import DocumentIntelligence, SmartChunker
+    _worker_components = (
+        FileParser(cache_dir=parse_cache),
+        DocumentIntelligence(cache_dir=docint_cache),
+        SmartChunker()
+    )
+
+
+def _process_one_file(file_info: Dict, components=None, chunk_overlap: int = 120) -> Optional[Dict]:
+    """
+    Parse, categorize and chunk one source.
+
+    Returns ``{'filename', 'metadata', 'chunks'}``, ``{'warning': ...}`` when
+    the file could not be parsed, or None when it is too short to index.
+    """
+    parser, doc_intel, smart_chunker = components or _worker_components
+
+    # Get content
+    if file_info['type'] == 'web':
+        from .retriever.ingest import _html_to_md
+        content = _html_to_md(file_info['content'])
+        filename = file_info['path']
+    else:
+        result = parser.parse_file(file_info['path'])
+        if not result or not result.get('content'):
+            return {'warning': f"Failed to parse: {file_info['path']}"}
+        content = result['content']
+        filename = Path(file_info['path']).name
+
+    if not content or len(content) < 100:
+        return None
+
+    # Categorize document
+    doc_category = doc_intel.categorize_document(filename, content)
+
+    # Extract metadata
+    metadata = doc_intel.extract_metadata(
+        content,
+        doc_category['metadata_extractors']
+    )
+    metadata['category'] = doc_category['category']
+    metadata['source_type'] = file_info['type']
+
+    # Smart chunking based on document type
+    chunks = smart_chunker.chunk(
+        content,
+        doc_category['chunk_strategy'],
+        doc_category['chunk_size'],
+        overlap=chunk_overlap
+    )
+
+    return {'filename': filename, 'metadata': metadata, 'chunks': chunks}
+
+
+def _iter_processed_files(all_files: List[Dict], components, cache_dirs):
+    """
+    Yield ``(file_info, outcome)`` for every file, in order.
+
+    ``outcome`` is the result of _process_one_file, or the exception it
+    raised. Files are processed across a process pool with at most two per
+    worker in flight, to bound the parsed content held: each yielded result
+    submits the next file, so a slow file only holds up its own slot. Fewer
+    than four files are processed inline with ``components``.
+    """
+    if len(all_files) < 4 or (os.cpu_count() or 1) <= 1:
+        for file_info in all_files:
+            try:
+                yield file_info, _process_one_file(file_info, components)
+            except Exception as e:
+                yield file_info, e
+        return
+
+    workers = min(os.cpu_count(), MAX_FILE_WORKERS, len(all_files))
+    window = 2 * workers
+    # Spawned, not forked: ingestion runs on a thread of the server process
+    # with torch/CUDA and Chroma already loaded, which fork can deadlock on.
+    # _init_file_worker rebuilds all worker state anyway
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_file_worker,
+                             initargs=cache_dirs,
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        try:
+            files = iter(all_files)
+            in_flight = deque(
+                (file_info, pool.submit(_process_one_file, file_info))
+                for file_info in islice(files, window)
+            )
+            while in_flight:
+                file_info, future = in_flight.popleft()
+                try:
+                    outcome = future.result()
+                except Exception as e:
+                    outcome = e
+                # Refill the freed slot before handing the result back, so
+                # workers stay busy while the caller handles it
+                for next_info in islice(files, 1):
+                    in_flight.append((next_info, pool.submit(_process_one_file, next_info)))
+                yield file_info, outcome
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+
+def _list_meta(v: list) -> str:
+    # Convert lists to comma-separated strings
+    if all(isinstance(item, str) for item in v):
+        return ', '.join(v)
+    return orjson.dumps(v).decode()
+
+
+def _json_meta(v) -> str:
+    # Convert dicts to JSON strings
+    return orjson.dumps(v).decode()
+
+
+def _other_meta(v):
+    # Subclasses of the handled types take the same route as their base
+    if isinstance(v, (str, int, float, bool)):
+        return v
+    if isinstance(v, list):
+        return _list_meta(v)
+    if isinstance(v, dict):
+        return _json_meta(v)
+    # Convert other types to string
+    return str(v)
+
+
+_META_HANDLERS = {
+    str: None,
+    int: None,
+    float: None,
+    bool: None,
+    list: _list_meta,
+    dict: _json_meta,
+}
+
+
+def _sanitize_meta(meta: Dict) -> Dict:
+    """Coerce metadata values to the primitive types ChromaDB accepts, dropping None."""
+    clean = {}
+    for k, v in meta.items():
+        if v is None:
+            continue
+        handler = _META_HANDLERS.get(type(v), _other_meta)
+        clean[k] = v if handler is None else handler(v)
+    return clean
+
+
+# Whitespace runs folded before hashing chunks for de-duplication
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Hashes per IN (...) lookup in the embedding cache
+_CACHE_LOOKUP_BATCH = 900
+
+
+def _open_embedding_cache(db_path: Path) -> Optional[sqlite3.Connection]:
+    """Open (creating if needed) the per-profile embedding cache, or None if unavailable."""
+    try:
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+                hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                vec BLOB NOT NULL,
+                PRIMARY KEY (hash, model)
+            ) WITHOUT ROWID
+        """)
+        return conn
+    except sqlite3.Error:
+        return None
+
+
+def _encode_cached(conn: Optional[sqlite3.Connection], embedder, model_name: str,
+                   chunks: List[Dict]):
+    """
+    Embed chunk records, reusing cached vectors keyed on (chunk hash, model).
+
+    Only cache misses go through the model (each distinct text once); their
+    vectors are written back in one transaction. Returns a float32 array in
+    the order of ``chunks``.
+    """
+    import numpy as np
+
+    def encode(texts):
+        return embedder.encode(texts, batch_size=64, convert_to_numpy=True,
+                               show_progress_bar=False).astype(np.float32, copy=False)
+
+    if conn is None:
+        return encode([c['text'] for c in chunks])
+
+    hashes = [c['hash'] for c in chunks]
+    vectors = {}
+    unique = list(dict.fromkeys(hashes))
+    try:
+        for start in range(0, len(unique), _CACHE_LOOKUP_BATCH):
+            batch = unique[start:start + _CACHE_LOOKUP_BATCH]
+            rows = conn.execute(
+                "SELECT hash, vec FROM embedding_cache "
+                f"WHERE model = ? AND hash IN ({','.join('?' * len(batch))})",
+                [model_name, *batch]
+            )
+            for h, vec in rows:
+                vectors[h] = np.frombuffer(vec, dtype=np.float32)
+    except sqlite3.Error:
+        pass
+
+    missing = {}  # hash -> index of the first chunk with that text
+    for i, h in enumerate(hashes):
+        if h not in vectors and h not in missing:
+            missing[h] = i
+    if missing:
+        fresh = encode([chunks[i]['text'] for i in missing.values()])
+        try:
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT OR REPLACE INTO embedding_cache VALUES (?, ?, ?, ?)",
+                [(h, model_name, len(v), v.tobytes()) for h, v in zip(missing, fresh)]
+            )
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+        vectors.update(zip(missing, fresh))
+
+    return np.stack([vectors[h] for h in hashes])
+
+class _OnnxEmbedder:
+    """
+    CPU embedder over an exported (optionally int8-quantized) ONNX model.
+
+    Exposes the slice of the SentenceTransformer API ingestion uses. Pooling
+    follows the export's ``1_Pooling/config.json`` (mean when absent) and
+    vectors are L2-normalized if the export has a Normalize module.
+    """
+
+    def __init__(self, path: str):
+        import json
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from transformers import AutoTokenizer
+
+        root = Path(path)
+        model_kwargs = {}
+        if root.is_file():
+            # A single model file such as model_quantized.onnx; the tokenizer
+            # and pooling configs are read from the export directory it sits in
+            model_kwargs["file_name"] = root.name
+            root = root.parent
+        self.model = ORTModelForFeatureExtraction.from_pretrained(root, provider="CPUExecutionProvider",
+                                                                  **model_kwargs)
+        self.tokenizer = AutoTokenizer.from_pretrained(root)
+        pooling_cfg = root / "1_Pooling" / "config.json"
+        modules_cfg = root / "modules.json"
+        self.cls_pooling = pooling_cfg.exists() and json.loads(
+            pooling_cfg.read_text()).get("pooling_mode_cls_token", False)
+        self.normalize = modules_cfg.exists() and "Normalize" in modules_cfg.read_text()
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.model.config.hidden_size
+
+    def encode(self, texts, batch_size: int = 32, show_progress_bar: bool = False,
+               convert_to_numpy: bool = True, **kwargs):
+        import numpy as np
+
+        out = []
+        for start in range(0, len(texts), batch_size):
+            enc = self.tokenizer(texts[start:start + batch_size], padding=True,
+                                 truncation=True, return_tensors="np")
+            hidden = self.model(**enc).last_hidden_state
+            if self.cls_pooling:
+                vecs = hidden[:, 0]
+            else:
+                mask = enc["attention_mask"][..., None].astype(hidden.dtype)
+                vecs = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if self.normalize:
+                vecs = vecs / np.clip(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12, None)
+            out.append(vecs.astype(np.float32, copy=False))
+        if not out:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+        return np.concatenate(out)
+
+
+# torch.set_num_threads is process-wide, so it is applied at most once
+_torch_threads_set = False
+
+
+def _make_embedder(embed_cfg: Dict):
+    """
+    Load the embedder for ingestion; returns ``(embedder, warning)``.
+
+    ``backend: onnx`` uses the ONNX Runtime embedder. ``onnx_path`` is the
+    export directory, or one ``.onnx`` file inside it (e.g. an int8
+    ``model_quantized.onnx``). If the export or optimum is missing it falls
+    back to SentenceTransformer and ``warning`` says why (otherwise None).
+    For SentenceTransformer, ``device`` pins the model (e.g. "cpu" for
+    reproducible runs), ``fp16`` (default on) halves the weights when the
+    model lands on CUDA, and ``threads`` sets torch's intra-op thread count
+    for CPU encoding.
+    """
+    global _torch_threads_set
+    warning = None
+    onnx_path = embed_cfg.get("onnx_path")
+    if embed_cfg.get("backend") == "onnx":
+        if onnx_path and Path(onnx_path).exists():
+            try:
+                return _OnnxEmbedder(onnx_path), None
+            except Exception as e:
+                warning = f"ONNX embedder unavailable ({e}), using SentenceTransformer"
+        else:
+            warning = f"ONNX model not found at {onnx_path}, using SentenceTransformer"
+
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    embedder = SentenceTransformer(embed_cfg["hf_name"], device=embed_cfg.get("device"))
+    if embedder.device.type == "cuda":
+        if embed_cfg.get("fp16", True):
+            embedder.half()
+    elif embed_cfg.get("threads") and not _torch_threads_set:
+        torch.set_num_threads(int(embed_cfg["threads"]))
+        _torch_threads_set = True
+    return embedder, warning
+
+
 class IngestionStatus(Enum):
     IDLE = "idle"
     PREPARING = "preparing"
@@ -23,6 +374,10 @@ class IngestionStatus(Enum):
     CANCELLED = "cancelled"
 
 class IngestionTask:
+    __slots__ = ('id', 'profile_name', 'status', 'progress', 'current_file', 'total_files',
+                 'processed_files', 'total_chunks', 'indexed_chunks', 'errors', 'warnings',
+                 'start_time', 'end_time', 'stats', 'cancel_requested', '_last_update_ts')
+
     def __init__(self, task_id: str, profile_name: str):
         self.id = task_id
         self.profile_name = profile_name
@@ -39,6 +394,7 @@ class IngestionTask:
         self.end_time = None
         self.stats = {}
         self.cancel_requested = False
+        self._last_update_ts = 0.0
 
     def to_dict(self) -> Dict:
         return {
@@ -132,7 +488,6 @@ class IngestionManager:
             from .retriever.ingest import _chunk, _hash
             from .file_parsers import FileParser, scan_directory
             from .document_intelligence import DocumentIntelligence, SmartChunker
-            from sentence_transformers import SentenceTransformer
             import chromadb
             from chromadb.config import Settings
 
@@ -141,12 +496,21 @@ class IngestionManager:
 
             # Initialize components
             task.status = IngestionStatus.PREPARING
-            parser = FileParser()
-            doc_intel = DocumentIntelligence()
+            parser = FileParser(cache_dir=paths["cache"] / "parsed")
+            doc_intel = DocumentIntelligence(cache_dir=paths["cache"] / "docint")
             smart_chunker = SmartChunker()
 
             # Initialize embedder first
-            embedder = SentenceTransformer(config["model"]["embedding"]["hf_name"])
+            model_name = config["model"]["embedding"]["hf_name"]
+            embedder, embedder_warning = _make_embedder(config["model"]["embedding"])
+            if embedder_warning:
+                task.warnings.append(embedder_warning)
+            # Tag non-default backends: their vectors must not share cache
+            # entries with, or be reused by search as, plain model output
+            if isinstance(embedder, _OnnxEmbedder):
+                model_name += "@onnx"
+            elif embedder.device.type == "cuda" and config["model"]["embedding"].get("fp16", True):
+                model_name += "@fp16"
 
             # Initialize ChromaDB
             client = chromadb.Client(Settings(
@@ -154,24 +518,40 @@ class IngestionManager:
                 persist_directory=str(paths["chroma"])
             ))
 
-            # Get or create collection
+            # Get or create collection. Opened without metadata: some chromadb
+            # releases overwrite stored metadata on get-or-create, which would
+            # replace the recorded dimension before it is compared
+            new_dim = embedder.get_sentence_embedding_dimension()
+            coll_meta = {"embedding_dim": new_dim, "model": model_name}
             coll = client.get_or_create_collection(name="docs")
 
             # Check embedding dimension if collection has existing items
             try:
-                if coll.count() > 0:
+                recorded = coll.metadata or {}
+                existing_dim = recorded.get("embedding_dim")
+                if existing_dim is None and coll.count() > 0:
                     sample = coll.peek(1)
-                    if sample['embeddings']:
+                    if sample['embeddings'] is not None and len(sample['embeddings']):
                         existing_dim = len(sample['embeddings'][0])
-                        test_embedding = embedder.encode(["test"], show_progress_bar=False)
-                        new_dim = test_embedding.shape[1]
-
-                        if existing_dim != new_dim:
-                            task.warnings.append(f"Embedding dimension mismatch: Collection has {existing_dim}D, model produces {new_dim}D")
-                            task.warnings.append("Clearing existing collection due to dimension mismatch...")
-                            client.delete_collection(name="docs")
-                            coll = client.get_or_create_collection(name="docs")
-                            task.warnings.append("Created new collection with correct dimensions")
+
+                if existing_dim is not None and existing_dim != new_dim:
+                    task.warnings.append(f"Embedding dimension mismatch: Collection has {existing_dim}D, model produces {new_dim}D")
+                    task.warnings.append("Clearing existing collection due to dimension mismatch...")
+                    client.delete_collection(name="docs")
+                    coll = client.get_or_create_collection(name="docs", metadata=coll_meta)
+                    task.warnings.append("Created new collection with correct dimensions")
+                elif not any(k.startswith("hnsw:") for k in recorded):
+                    # Record the dimension so later runs can skip the peek().
+                    # The model tag lets search reuse stored vectors, so it is
+                    # only set on an empty collection; re-ingesting with another
+                    # backend leaves vectors of both behind and drops the tag
+                    meta = {**recorded, "embedding_dim": new_dim}
+                    if coll.count() == 0:
+                        meta["model"] = model_name
+                    elif recorded.get("model") != model_name:
+                        meta.pop("model", None)
+                    if meta != recorded:
+                        coll.modify(metadata=meta)
             except Exception:
                 pass  # Dimension check failed, continue with existing collection
 
@@ -190,17 +570,27 @@ class IngestionManager:
 
                 task.current_file = f"Crawling {domain}..."
 
+                # Allowed paths crawl in parallel threads, so pages are counted
+                # across all of them under a lock
+                crawl_lock = threading.Lock()
+
                 def _crawl_progress(url, count):
-                    task.current_file = f"Crawling... {url.split('/')[-1] or url}"
-                    task.processed_files = count
+                    with crawl_lock:
+                        task.current_file = f"Crawling... {url.split('/')[-1] or url}"
+                        task.processed_files += 1
 
                 # Start crawling
                 if allowed:
                     raw = {}
-                    for path in allowed:
-                        start_url = domain + path
-                        crawl_results = crawl_website(start_url, allowed, depth, paths["cache"], on_page=_crawl_progress)
-                        raw.update(crawl_results)
+
+                    def _crawl(path):
+                        return crawl_website(domain + path, allowed, depth, paths["cache"], on_page=_crawl_progress)
+
+                    # map() keeps results in allowed-path order, so the file
+                    # list (and chunk ids) stay the same from run to run
+                    with ThreadPoolExecutor(max_workers=min(8, len(allowed))) as ex:
+                        for crawl_results in ex.map(_crawl, allowed):
+                            raw.update(crawl_results)
                 else:
                     raw = crawl_website(domain, allowed, depth, paths["cache"], on_page=_crawl_progress)
 
@@ -249,78 +639,59 @@ class IngestionManager:
             task.status = IngestionStatus.PROCESSING
             all_chunks = []
             file_metadata = []
-
-            for i, file_info in enumerate(all_files):
+            # Chunks whose case/whitespace-folded text was already seen are
+            # counted and skipped instead of being embedded and stored again
+            seen_chunks: set = set()
+            deduplicated = 0
+
+            # Parsing, categorization and chunking run in worker processes;
+            # results come back in file order, so chunk indexes are stable
+            processed = _iter_processed_files(
+                all_files,
+                (parser, doc_intel, smart_chunker),
+                (paths["cache"] / "parsed", paths["cache"] / "docint")
+            )
+            for i, (file_info, outcome) in enumerate(processed):
                 if task.cancel_requested:
+                    processed.close()
                     task.status = IngestionStatus.CANCELLED
                     return
 
-                task.current_file = file_info['path']
+                # The displayed file only needs to change a few times a second
+                now = time.monotonic()
+                if now - task._last_update_ts > CURRENT_FILE_INTERVAL:
+                    task.current_file = file_info['path']
+                    task._last_update_ts = now
                 task.processed_files = i + 1
                 task.progress = (i / len(all_files)) * 0.7  # 70% for processing
 
                 try:
-                    # Get content
-                    if file_info['type'] == 'web':
-                        from .retriever.ingest import _html_to_md
-                        content = _html_to_md(file_info['content'])
-                        filename = file_info['path']
-                    else:
-                        result = parser.parse_file(file_info['path'])
-                        if not result or not result.get('content'):
-                            task.warnings.append(f"Failed to parse: {file_info['path']}")
-                            continue
-                        content = result['content']
-                        filename = Path(file_info['path']).name
-
-                    if not content or len(content) < 100:
+                    if isinstance(outcome, Exception):
+                        raise outcome
+                    if outcome is None:
+                        continue
+                    if 'warning' in outcome:
+                        task.warnings.append(outcome['warning'])
                         continue
 
-                    # Categorize document
-                    doc_category = doc_intel.categorize_document(filename, content)
-
-                    # Extract metadata
-                    metadata = doc_intel.extract_metadata(
-                        content,
-                        doc_category['metadata_extractors']
-                    )
-                    metadata['category'] = doc_category['category']
-                    metadata['source_type'] = file_info['type']
-
-                    # Smart chunking based on document type
-                    chunk_strategy = doc_category['chunk_strategy']
-                    chunk_size = doc_category['chunk_size']
+                    filename = outcome['filename']
+                    metadata = outcome['metadata']
+                    chunks = outcome['chunks']
 
-                    chunks = smart_chunker.chunk(
-                        content,
-                        chunk_strategy,
-                        chunk_size,
-                        overlap=120
-                    )
+                    # Clean metadata once per file - ChromaDB only accepts primitive types
+                    clean_metadata = _sanitize_meta(metadata)
 
                     # Create chunk records
+                    fname_hash = _hash(filename)
                     for chunk_data in chunks:
-                        chunk_id = f"{_hash(filename)}_{len(all_chunks)}_{_hash(chunk_data['text'])[:8]}"
-
-                        # Clean metadata - ChromaDB only accepts primitive types
-                        clean_metadata = {}
-                        for k, v in metadata.items():
-                            if v is None:
-                                continue
-                            elif isinstance(v, (str, int, float, bool)):
-                                clean_metadata[k] = v
-                            elif isinstance(v, list):
-                                # Convert lists to comma-separated strings
-                                if all(isinstance(item, str) for item in v):
-                                    clean_metadata[k] = ', '.join(v)
-                                else:
-                                    clean_metadata[k] = json.dumps(v)
-                            elif isinstance(v, dict):
-                                # Convert dicts to JSON strings
-                                clean_metadata[k] = json.dumps(v)
-                            else:
-                                # Convert other types to string
-                                clean_metadata[k] = str(v)
+                        text_hash = _hash(chunk_data['text'])
+                        chunk_id = f"{fname_hash}_{len(all_chunks)}_{text_hash[:8]}"
+
+                        folded_hash = _hash(_WHITESPACE_RE.sub(' ', chunk_data['text']).strip().lower())
+                        if folded_hash in seen_chunks:
+                            deduplicated += 1
+                            continue
+                        seen_chunks.add(folded_hash)
 
                         chunk_metadata = {
                             **clean_metadata,
@@ -347,12 +718,13 @@ class IngestionManager:
                         all_chunks.append({
                             'id': chunk_id,
                             'text': chunk_data['text'],
+                            'hash': text_hash,
                             'metadata': chunk_metadata
                         })
 
                     # Store file metadata for relationship detection
                     file_metadata.append({
-                        'id': _hash(filename),
+                        'id': fname_hash,
                         'filename': filename,
                         'metadata': metadata,
                         'chunk_count': len(chunks)
@@ -372,32 +744,45 @@ class IngestionManager:
             task.status = IngestionStatus.INDEXING
 
             if all_chunks:
-                # Batch process for efficiency
-                batch_size = 100
-                for i in range(0, len(all_chunks), batch_size):
+                # Vectors of unchanged chunks are reused across ingests
+                embedding_cache = _open_embedding_cache(paths["cache"] / "embeddings.db")
+
+                # Batch process for efficiency; each upsert is one Chroma write
+                batch_size = int(config["model"].get("index_batch", 250))
+                for w in range(0, len(all_chunks), EMBED_WINDOW):
                     if task.cancel_requested:
                         task.status = IngestionStatus.CANCELLED
+                        if embedding_cache is not None:
+                            embedding_cache.close()
                         return
 
-                    batch = all_chunks[i:i + batch_size]
+                    # Embed a whole window in one encode() call: it sorts its
+                    # input by length, so the model batches see little padding
+                    window = all_chunks[w:w + EMBED_WINDOW]
+                    window_embeddings = _encode_cached(embedding_cache, embedder, model_name, window)
+
+                    for i in range(0, len(window), batch_size):
+                        batch = window[i:i + batch_size]
 
-                    ids = [c['id'] for c in batch]
-                    texts = [c['text'] for c in batch]
-                    metadatas = [c['metadata'] for c in batch]
+                        ids = [c['id'] for c in batch]
+                        texts = [c['text'] for c in batch]
+                        metadatas = [c['metadata'] for c in batch]
+                        # float32 slice goes to Chroma as is, no nested float lists
+                        embeddings = window_embeddings[i:i + batch_size]
 
-                    # Generate embeddings
-                    embeddings = embedder.encode(texts, show_progress_bar=False).tolist()
+                        # Upsert to ChromaDB
+                        coll.upsert(
+                            ids=ids,
+                            documents=texts,
+                            metadatas=metadatas,
+                            embeddings=embeddings
+                        )
 
-                    # Upsert to ChromaDB
-                    coll.upsert(
-                        ids=ids,
-                        documents=texts,
-                        metadatas=metadatas,
-                        embeddings=embeddings
-                    )
+                        task.indexed_chunks = min(w + i + batch_size, len(all_chunks))
+                        task.progress = 0.7 + (task.indexed_chunks / len(all_chunks)) * 0.25
 
-                    task.indexed_chunks = min(i + batch_size, len(all_chunks))
-                    task.progress = 0.7 + (task.indexed_chunks / len(all_chunks)) * 0.25
+                if embedding_cache is not None:
+                    embedding_cache.close()
 
             # Detect relationships (optional, for future use)
             # relationships = DocumentRelationshipDetector().detect_relationships(file_metadata)
@@ -413,6 +798,7 @@ class IngestionManager:
                 'processed_files': task.processed_files,
                 'total_chunks': task.total_chunks,
                 'indexed_chunks': task.indexed_chunks,
+                'deduplicated': deduplicated,
                 'errors_count': len(task.errors),
                 'warnings_count': len(task.warnings),
                 'duration_seconds': (task.end_time - task.start_time).total_seconds() if task.end_time and task.start_time else 0,
@@ -1,7 +1,57 @@
-import subprocess, tempfile, textwrap, shlex, requests, json
+import os, subprocess, tempfile, textwrap, requests, json
 from .guards.prompts import build_prompt
 
-def _run_with_ollama(cfg, question, passages):
+# One keep-alive session for all Ollama calls, so each query reuses the
+# open connection instead of setting up a new one
+_SESSION = requests.Session()
+_SESSION.mount("http://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=8))
+_post = _SESSION.post
+
+OLLAMA_URL = "http://127.0.0.1:11434/api/generate"
+
+def _generate(payload: dict, timeout: float, stream: bool = True) -> str:
+    """
+    Call Ollama's generate endpoint and return the response text.
+
+    Streams by default: fragments are collected as they arrive and the read
+    stops at the ``done`` message instead of waiting for a buffered body.
+    """
+    if not stream:
+        r = _post(OLLAMA_URL, json={**payload, "stream": False}, timeout=timeout)
+        r.raise_for_status()
+        return r.json().get("response") or ""
+
+    return "".join(_iter_generate(payload, timeout))
+
+def _iter_generate(payload: dict, timeout: float):
+    """Yield response fragments from a streaming Ollama generate call."""
+    with _post(OLLAMA_URL, json={**payload, "stream": True}, timeout=(5, timeout), stream=True) as r:
+        r.raise_for_status()
+        for line in r.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            yield chunk.get("response") or ""
+            if chunk.get("done"):
+                break
+
+def warm_llm(cfg) -> None:
+    """Load the Ollama model into memory so the first query doesn't wait for it."""
+    if cfg["model"]["llm"].get("mode", "llamacpp").lower() != "ollama":
+        return  # llama.cpp runs a fresh process per query, nothing to keep warm
+    # An empty prompt makes Ollama load the model and return without generating
+    r = _post(OLLAMA_URL, json={"model": cfg["model"]["llm"]["ollama_model"], "prompt": "", "stream": False}, timeout=600)
+    r.raise_for_status()
+
+def clean_answer(out: str, supercharged: bool = False) -> str:
+    """Strip the prompt preamble a model may echo back before its answer."""
+    if supercharged and "YOUR COMPREHENSIVE RESPONSE:" in out:
+        return out.split("YOUR COMPREHENSIVE RESPONSE:", 1)[1].strip()
+    if "Answer:" in out:
+        return out.split("Answer:", 1)[1].strip()
+    return out.strip()
+
+def _ollama_payload(cfg, question, passages) -> dict:
     model = cfg["model"]["llm"]["ollama_model"]
     n_ctx = int(cfg["model"]["llm"].get("n_ctx", 256000))
     temperature = float(cfg["model"]["llm"].get("temperature", 0.2))
@@ -11,20 +61,18 @@ def _run_with_ollama(cfg, question, passages):
     payload = {
         "model": model,
         "prompt": prompt,
-        "stream": False,
         "options": {
             "num_ctx": n_ctx,
             "temperature": temperature,
             "top_p": top_p
         }
     }
-    r = requests.post("http://127.0.0.1:11434/api/generate", json=payload, timeout=600)
-    r.raise_for_status()
-    data = r.json()
-    out = (data.get("response") or "").strip()
-    if "Answer:" in out:
-        out = out.split("Answer:", 1)[1].strip()
-    return out
+    return payload
+
+def _run_with_ollama(cfg, question, passages):
+    payload = _ollama_payload(cfg, question, passages)
+    stream = bool(cfg["model"]["llm"].get("stream", True))
+    return clean_answer(_generate(payload, timeout=600, stream=stream))
 
 def _run_with_llamacpp(cfg, question, passages):
     model = cfg["model"]["llm"]["path"]
@@ -38,17 +86,31 @@ def _run_with_llamacpp(cfg, question, passages):
         f.write(prompt)
         prompt_path = f.name
 
-    cmd = f"{shlex.quote(llama_bin)} -m {shlex.quote(model)} -n 512 -c {n_ctx} --temp 0.2 --top-p 0.9 -f {shlex.quote(prompt_path)}"
+    argv = [llama_bin, "-m", model, "-n", "512", "-c", str(n_ctx),
+            "--temp", "0.2", "--top-p", "0.9", "-f", prompt_path]
     try:
-        out = subprocess.check_output(cmd, shell=True, text=True, stderr=subprocess.STDOUT, encoding="utf-8")
-    except subprocess.CalledProcessError as e:
-        out = e.output or "LLM error"
-    if "Answer:" in out:
-        out = out.split("Answer:", 1)[1].strip()
-    return out.strip()
+        proc = subprocess.run(argv, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                              text=True, encoding="utf-8", check=False)
+        out = proc.stdout
+        if proc.returncode != 0 and not out:
+            out = "LLM error"
+    finally:
+        os.unlink(prompt_path)
+    return clean_answer(out)
 
 def run_llm(cfg, question: str, passages: list[str]) -> str:
     mode = cfg["model"]["llm"].get("mode", "llamacpp").lower()
     if mode == "ollama":
         return _run_with_ollama(cfg, question, passages)
     return _run_with_llamacpp(cfg, question, passages)
+
+def stream_llm(cfg, question: str, passages: list[str]):
+    """
+    Like run_llm, but yields the answer as it is generated. Ollama streams
+    token fragments; llama.cpp yields the finished answer once.
+    """
+    mode = cfg["model"]["llm"].get("mode", "llamacpp").lower()
+    if mode == "ollama":
+        yield from _iter_generate(_ollama_payload(cfg, question, passages), 600)
+    else:
+        yield _run_with_llamacpp(cfg, question, passages)
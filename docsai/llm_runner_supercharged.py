@@ -1,16 +1,27 @@
-import subprocess, tempfile, textwrap, shlex, requests, json
-from .guards.prompts_supercharged import build_prompt, build_supercharged_prompt
-
-def _run_with_ollama(cfg, question, passages, supercharged=True, prompt_mode=None):
+import os, re, subprocess, tempfile, textwrap, requests, json
+from functools import lru_cache
+from .guards.prompts_supercharged import build_prompt, build_supercharged_prompt, _keywords
+from .llm_runner import _generate, _iter_generate, warm_llm, clean_answer
+
+@lru_cache(maxsize=256)
+def _cached_prompt(mode: str | None, supercharged: bool, question: str, passages_tuple: tuple) -> str:
+    if supercharged and mode:
+        return build_supercharged_prompt(question, list(passages_tuple), mode=mode)
+    return build_prompt(question, list(passages_tuple), supercharged=supercharged)
+
+def _build_prompt(cfg, question, passages, supercharged, prompt_mode) -> str:
     """
-    Run LLM with Ollama API
+    Build the prompt for a query, reusing the last result for retries and
+    re-renders of the same (mode, question, passages). Set
+    model.llm.prompt_cache to false to always rebuild.
+    """
+    if cfg["model"]["llm"].get("prompt_cache", True):
+        return _cached_prompt(prompt_mode, supercharged, question, tuple(passages))
+    return _cached_prompt.__wrapped__(prompt_mode, supercharged, question, tuple(passages))
 
-    Args:
-        cfg: Configuration dict
-        question: User's question
-        passages: Retrieved passages
-        supercharged: Use supercharged prompts (default: True)
-        prompt_mode: Specific prompt mode ('comprehensive', 'integration', 'debugging', 'learning')
+def _ollama_request(cfg, question, passages, supercharged=True, prompt_mode=None):
+    """
+    Build the Ollama generate payload and its timeout for a query
     """
     model = cfg["model"]["llm"]["ollama_model"]
     n_ctx = int(cfg["model"]["llm"].get("n_ctx", 256000))
@@ -25,10 +36,7 @@ def _run_with_ollama(cfg, question, passages, supercharged=True, prompt_mode=Non
     top_p = float(cfg["model"]["llm"].get("top_p", 0.9))
 
     # Build the appropriate prompt
-    if supercharged and prompt_mode:
-        prompt = build_supercharged_prompt(question, passages, mode=prompt_mode)
-    else:
-        prompt = build_prompt(question, passages, supercharged=supercharged)
+    prompt = _build_prompt(cfg, question, passages, supercharged, prompt_mode)
 
     # For supercharged mode, request more tokens for comprehensive responses
     max_tokens = 2048 if supercharged else 512
@@ -36,7 +44,6 @@ def _run_with_ollama(cfg, question, passages, supercharged=True, prompt_mode=Non
     payload = {
         "model": model,
         "prompt": prompt,
-        "stream": False,
         "options": {
             "num_ctx": n_ctx,
             "temperature": temperature,
@@ -48,26 +55,25 @@ def _run_with_ollama(cfg, question, passages, supercharged=True, prompt_mode=Non
 
     # Longer timeout for comprehensive responses
     timeout = 900 if supercharged else 600
+    return payload, timeout
+
+def _run_with_ollama(cfg, question, passages, supercharged=True, prompt_mode=None):
+    """
+    Run LLM with Ollama API
+
+    Args:
+        cfg: Configuration dict
+        question: User's question
+        passages: Retrieved passages
+        supercharged: Use supercharged prompts (default: True)
+        prompt_mode: Specific prompt mode ('comprehensive', 'integration', 'debugging', 'learning')
+    """
+    payload, timeout = _ollama_request(cfg, question, passages, supercharged, prompt_mode)
 
     try:
-        r = requests.post("http://127.0.0.1:11434/api/generate", json=payload, timeout=timeout)
-        r.raise_for_status()
-        data = r.json()
-        out = (data.get("response") or "").strip()
-
-        # Clean up response based on mode
-        if supercharged:
-            # For supercharged, look for the response section
-            if "YOUR COMPREHENSIVE RESPONSE:" in out:
-                out = out.split("YOUR COMPREHENSIVE RESPONSE:", 1)[1].strip()
-            elif "Answer:" in out:
-                out = out.split("Answer:", 1)[1].strip()
-        else:
-            # Original parsing for basic mode
-            if "Answer:" in out:
-                out = out.split("Answer:", 1)[1].strip()
-
-        return out
+        stream = bool(cfg["model"]["llm"].get("stream", True))
+        out = _generate(payload, timeout=timeout, stream=stream)
+        return clean_answer(out, supercharged)
 
     except requests.exceptions.Timeout:
         return "Request timed out. The question may require a simpler query or the model may be overloaded."
@@ -91,10 +97,7 @@ def _run_with_llamacpp(cfg, question, passages, supercharged=True, prompt_mode=N
     n_ctx = cfg["model"]["llm"].get("n_ctx", 120000)
 
     # Build the appropriate prompt
-    if supercharged and prompt_mode:
-        prompt = build_supercharged_prompt(question, passages, mode=prompt_mode)
-    else:
-        prompt = build_prompt(question, passages, supercharged=supercharged)
+    prompt = _build_prompt(cfg, question, passages, supercharged, prompt_mode)
 
     # Write prompt to a temp file to avoid cmdline escaping mess
     import tempfile
@@ -106,24 +109,32 @@ def _run_with_llamacpp(cfg, question, passages, supercharged=True, prompt_mode=N
     n_predict = 2048 if supercharged else 512
     temp = 0.1 if prompt_mode in ["debugging", "integration"] else 0.2
 
-    cmd = f"{shlex.quote(llama_bin)} -m {shlex.quote(model)} -n {n_predict} -c {n_ctx} --temp {temp} --top-p 0.9 -f {shlex.quote(prompt_path)}"
+    argv = [llama_bin, "-m", model, "-n", str(n_predict), "-c", str(n_ctx),
+            "--temp", str(temp), "--top-p", "0.9", "-f", prompt_path]
 
     try:
-        out = subprocess.check_output(cmd, shell=True, text=True, stderr=subprocess.STDOUT, encoding="utf-8")
-    except subprocess.CalledProcessError as e:
-        out = e.output or "LLM error"
-
-    # Clean up response
-    if supercharged:
-        if "YOUR COMPREHENSIVE RESPONSE:" in out:
-            out = out.split("YOUR COMPREHENSIVE RESPONSE:", 1)[1].strip()
-        elif "Answer:" in out:
-            out = out.split("Answer:", 1)[1].strip()
-    else:
-        if "Answer:" in out:
-            out = out.split("Answer:", 1)[1].strip()
-
-    return out.strip()
+        proc = subprocess.run(argv, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                              text=True, encoding="utf-8", check=False)
+        out = proc.stdout
+        if proc.returncode != 0 and not out:
+            out = "LLM error"
+    finally:
+        os.unlink(prompt_path)
+
+    return clean_answer(out, supercharged)
+
+# Keyword groups for detect_prompt_mode, in priority order
+_PROMPT_MODE_PATTERNS = (
+    ("integration", _keywords(
+        "implement", "integrate", "build", "create", "setup", "configure",
+        "workflow", "architecture", "design", "develop", "deploy")),
+    ("debugging", _keywords(
+        "error", "fail", "issue", "problem", "fix", "debug", "wrong",
+        "not working", "broken", "troubleshoot", "solve")),
+    ("learning", _keywords(
+        "what is", "what are", "how does", "how do", "explain",
+        "understand", "learn", "why", "when", "difference between")),
+)
 
 def detect_prompt_mode(question: str) -> str:
     """
@@ -134,26 +145,9 @@ def detect_prompt_mode(question: str) -> str:
     """
     question_lower = question.lower()
 
-    # Integration patterns
-    if any(word in question_lower for word in [
-        "implement", "integrate", "build", "create", "setup", "configure",
-        "workflow", "architecture", "design", "develop", "deploy"
-    ]):
-        return "integration"
-
-    # Debugging patterns
-    if any(word in question_lower for word in [
-        "error", "fail", "issue", "problem", "fix", "debug", "wrong",
-        "not working", "broken", "troubleshoot", "solve"
-    ]):
-        return "debugging"
-
-    # Learning patterns
-    if any(word in question_lower for word in [
-        "what is", "what are", "how does", "how do", "explain",
-        "understand", "learn", "why", "when", "difference between"
-    ]):
-        return "learning"
+    for mode, pattern in _PROMPT_MODE_PATTERNS:
+        if pattern.search(question_lower):
+            return mode
 
     # Default to comprehensive
     return "comprehensive"
@@ -172,6 +166,31 @@ def run_llm(cfg, question: str, passages: list[str], supercharged: bool = None,
     Returns:
         The LLM's response as a string
     """
+    supercharged, prompt_mode = _resolve_prompt_settings(cfg, question, supercharged, prompt_mode)
+    mode = cfg["model"]["llm"].get("mode", "llamacpp").lower()
+
+    if mode == "ollama":
+        return _run_with_ollama(cfg, question, passages, supercharged, prompt_mode)
+    else:
+        return _run_with_llamacpp(cfg, question, passages, supercharged, prompt_mode)
+
+def stream_llm(cfg, question: str, passages: list[str], supercharged: bool = None, prompt_mode: str = None):
+    """
+    Like run_llm, but yields the answer as it is generated
+
+    Ollama streams token fragments as they arrive; llama.cpp yields the
+    finished answer once. Request errors are raised to the caller.
+    """
+    supercharged, prompt_mode = _resolve_prompt_settings(cfg, question, supercharged, prompt_mode)
+    mode = cfg["model"]["llm"].get("mode", "llamacpp").lower()
+
+    if mode == "ollama":
+        payload, timeout = _ollama_request(cfg, question, passages, supercharged, prompt_mode)
+        yield from _iter_generate(payload, timeout)
+    else:
+        yield _run_with_llamacpp(cfg, question, passages, supercharged, prompt_mode)
+
+def _resolve_prompt_settings(cfg, question, supercharged, prompt_mode):
     # Check config for supercharged setting, default to True
     if supercharged is None:
         supercharged = cfg.get("model", {}).get("llm", {}).get("supercharged", True)
@@ -181,31 +200,23 @@ def run_llm(cfg, question: str, passages: list[str], supercharged: bool = None,
         prompt_mode = detect_prompt_mode(question)
         print(f"[LLM] Using {prompt_mode} mode for this question")
 
-    mode = cfg["model"]["llm"].get("mode", "llamacpp").lower()
-
-    if mode == "ollama":
-        return _run_with_ollama(cfg, question, passages, supercharged, prompt_mode)
-    else:
-        return _run_with_llamacpp(cfg, question, passages, supercharged, prompt_mode)
+    return supercharged, prompt_mode
 
 # Enhanced response post-processing
+_HEADER_RE = re.compile(r"(?<!\n)\n(#+ )")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
 def enhance_response_formatting(response: str) -> str:
     """
     Enhance the formatting of the response for better readability
 
     This is especially useful for supercharged responses that may be longer
     """
-    # Ensure proper spacing around headers
-    response = response.replace("\n#", "\n\n#")
-    response = response.replace("#", "\n#")
-
-    # Ensure proper spacing around code blocks
-    response = response.replace("```", "\n```")
-    response = response.replace("```\n\n", "```\n")
+    # Ensure a blank line before markdown headers
+    response = _HEADER_RE.sub(r"\n\n\1", response)
 
     # Clean up excessive newlines
-    while "\n\n\n" in response:
-        response = response.replace("\n\n\n", "\n\n")
+    response = _BLANK_LINES_RE.sub("\n\n", response)
 
     return response.strip()
 
@@ -2,9 +2,6 @@ import logging
 import os
 from logging.handlers import RotatingFileHandler
 
-# Create logs directory if it doesn't exist
-os.makedirs("logs", exist_ok=True)
-
 # Formatting
 log_format = logging.Formatter(
     "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -27,6 +24,7 @@ def get_logger(name, log_file=None, level=logging.INFO):
 
     # File handler
     if log_file:
+        os.makedirs("logs", exist_ok=True)
         file_handler = RotatingFileHandler(
             os.path.join("logs", log_file), 
             maxBytes=10*1024*1024, # 10MB
@@ -37,7 +35,17 @@ def get_logger(name, log_file=None, level=logging.INFO):
 
     return logger
 
-# Pre-defined loggers
-server_logger = get_logger("docsai.server", "server.log")
-ingest_logger = get_logger("docsai.ingest", "ingest.log")
-llm_logger = get_logger("docsai.llm", "server.log")
+# Pre-defined loggers, built on first access so importing this module
+# doesn't create logs/ or open any log files
+_PREDEFINED = {
+    "server_logger": ("docsai.server", "server.log"),
+    "ingest_logger": ("docsai.ingest", "ingest.log"),
+    "llm_logger": ("docsai.llm", "server.log"),
+}
+
+def __getattr__(name):
+    if name in _PREDEFINED:
+        logger = get_logger(*_PREDEFINED[name])
+        globals()[name] = logger
+        return logger
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,15 +1,22 @@
+import asyncio
 import typer, uvicorn
 from fastapi import FastAPI, Query, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pathlib import Path
 from typing import List, Optional
 from pydantic import BaseModel
 import yaml
 import os
+import re
 import sys
 import json
+import orjson
+import threading
+import time
 import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 from .config_loader import load_config, profile_paths
 from .retriever.ingest import ingest_profile
@@ -30,15 +37,15 @@ from rich.console import Console
 from rich.table import Table
 # Use supercharged LLM runner for comprehensive responses
 try:
-    from .llm_runner_supercharged import run_llm, detect_prompt_mode
+    from .llm_runner_supercharged import run_llm, stream_llm, detect_prompt_mode, warm_llm, clean_answer
 except ImportError:
     # Fallback to original if supercharged not available
-    from .llm_runner import run_llm
+    from .llm_runner import run_llm, stream_llm, warm_llm, clean_answer
     detect_prompt_mode = lambda x: "comprehensive"
 from .guards.validator import validate_answer
 from .ingestion_manager import ingestion_manager
 
-app = FastAPI(title="DocsAI Local")
+app = FastAPI(title="DocsAI Local", default_response_class=ORJSONResponse)
 cli = typer.Typer(help="DocsAI command line")
 
 app.add_middleware(
@@ -54,8 +61,37 @@ app.add_middleware(
 )
 
 
+# Background warmup started by the startup hook (kept referenced until done)
+_warmup_task = None
+# Other fire-and-forget tasks, referenced here so they aren't collected early
+_background_tasks: set[asyncio.Task] = set()
+
+async def _warm(name: str, fn, *args) -> None:
+    start = time.perf_counter()
+    try:
+        await asyncio.to_thread(fn, *args)
+        server_logger.info(f"Warmed {name} in {time.perf_counter() - start:.1f}s")
+    except Exception as e:
+        server_logger.warning(f"Warmup of {name} failed: {e}")
+
+@app.on_event("startup")
+async def warmup():
+    """
+    Load the embedding model, the Chroma store and the LLM in the background
+    when serving a profile, so the first /ask doesn't pay for them.
+    """
+    global _warmup_task
+    if global_cfg is None or global_profile is None:
+        return
+    paths = profile_paths(global_profile)
+    _warmup_task = asyncio.gather(
+        _warm("retriever", search_docs, global_cfg, paths, "warmup"),
+        _warm("chroma client", _get_or_open_chroma, global_profile, paths["chroma"]),
+        _warm("LLM", warm_llm, global_cfg),
+    )
+
 @app.get("/status")
-def status():
+async def status():
     return {"ok": True, "message": "DocsAI backend running."}
 
 class AskResponse(BaseModel):
@@ -72,12 +108,31 @@ class ProfileCreateRequest(BaseModel):
     chunkSize: int = 800
     description: Optional[str] = ""
 
+# Numbered citations in LLM answers, e.g. [1], [2]
+CITATION_RE = re.compile(r'\[(\d+)\]')
+
 # Global variables to store config and profile
 global_cfg = None
 global_profile = None
 
+# In-flight LLM generations keyed by (profile, question, passages, supercharged,
+# mode); identical concurrent /ask requests await the same generation
+_inflight_llm: dict[tuple, asyncio.Future] = {}
+
+async def _run_llm_shared(q: str, passages: list[str], supercharged: bool, mode: Optional[str]) -> str:
+    key = (global_profile, q, tuple(passages), supercharged, mode)
+    fut = _inflight_llm.get(key)
+    if fut is None:
+        fut = asyncio.ensure_future(asyncio.to_thread(
+            run_llm, global_cfg, q, passages, supercharged=supercharged, prompt_mode=mode
+        ))
+        _inflight_llm[key] = fut
+        fut.add_done_callback(lambda _: _inflight_llm.pop(key, None))
+    # Shielded so one client disconnecting doesn't cancel it for the others
+    return await asyncio.shield(fut)
+
 @app.get("/health")
-def health():
+async def health():
     return {"ok": True}
 
 @app.post("/profiles/create")
@@ -99,7 +154,7 @@ async def create_profile(request: ProfileCreateRequest):
             file_types=request.fileTypes if request.fileTypes else None,
         )
 
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "success": True,
             "profile": request.name,
             "path": str(profile_dir),
@@ -116,20 +171,25 @@ async def create_profile(request: ProfileCreateRequest):
 @app.get("/profiles/list")
 async def list_profiles():
     """List all available profiles."""
+    names = await asyncio.to_thread(discover_profiles)
+    # Each summary opens Chroma and walks the cache; do them concurrently
+    summaries = await asyncio.gather(
+        *(asyncio.to_thread(get_profile_summary, name) for name in names),
+        return_exceptions=True
+    )
+
     profiles = []
-    for name in discover_profiles():
-        try:
-            s = get_profile_summary(name)
-            profiles.append({
-                "name": s["name"],
-                "description": s["description"],
-                "source_type": s["source_type"],
-                "path": str(Path("profiles") / name),
-            })
-        except Exception:
-            pass
+    for name, s in zip(names, summaries):
+        if isinstance(s, Exception):
+            continue
+        profiles.append({
+            "name": s["name"],
+            "description": s["description"],
+            "source_type": s["source_type"],
+            "path": str(Path("profiles") / name),
+        })
 
-    return JSONResponse(content={"profiles": profiles})
+    return ORJSONResponse(content={"profiles": profiles})
 
 @app.post("/ingestion/start/{profile_name}")
 async def start_ingestion(profile_name: str):
@@ -141,7 +201,7 @@ async def start_ingestion(profile_name: str):
         # Start ingestion task
         task_id = ingestion_manager.start_ingestion(profile_name, config)
 
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "success": True,
             "task_id": task_id,
             "message": f"Ingestion started for profile '{profile_name}'"
@@ -157,13 +217,13 @@ async def get_ingestion_status(task_id: str):
     if not status:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    return JSONResponse(content=status)
+    return ORJSONResponse(content=status)
 
 @app.get("/ingestion/active")
 async def get_active_ingestion():
     """Get the currently active ingestion task if any."""
     active_task = ingestion_manager.get_active_task()
-    return JSONResponse(content={"active_task": active_task})
+    return ORJSONResponse(content={"active_task": active_task})
 
 @app.post("/ingestion/cancel/{task_id}")
 async def cancel_ingestion(task_id: str):
@@ -173,7 +233,7 @@ async def cancel_ingestion(task_id: str):
     if not success:
         raise HTTPException(status_code=400, detail="Cannot cancel task - it may not be running")
 
-    return JSONResponse(content={
+    return ORJSONResponse(content={
         "success": True,
         "message": f"Cancellation requested for task {task_id}"
     })
@@ -184,18 +244,44 @@ async def clear_cache(profile_name: str):
     import shutil
     from pathlib import Path
 
+    def remove_trash(dirs):
+        for d in dirs:
+            shutil.rmtree(d, ignore_errors=True)
+
+    def remove_trash_later(dirs):
+        task = asyncio.create_task(asyncio.to_thread(remove_trash, dirs))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
     try:
         # Get the cache path for this profile
         cache_dir = Path(f"profiles/{profile_name}/cache")
 
+        # Trash left by earlier clears (server stopped mid-delete, or files
+        # rmtree couldn't remove) is swept along with this one
+        trash_dirs = [d for d in cache_dir.parent.glob(".trash-*") if d.is_dir()]
+
         if not cache_dir.exists():
-            return JSONResponse(content={
+            if trash_dirs:
+                remove_trash_later(trash_dirs)
+            return ORJSONResponse(content={
                 "success": True,
                 "message": f"No cache found for profile '{profile_name}'"
             })
 
-        # Remove the cache directory and recreate it
-        shutil.rmtree(cache_dir)
+        # Move the cache aside and delete it in the background, so the
+        # request doesn't wait on removing every cached page
+        _drop_chroma(profile_name)
+        trash = cache_dir.with_name(f".trash-{uuid.uuid4().hex}")
+        try:
+            cache_dir.rename(trash)
+        except OSError:
+            # e.g. Windows with a file still open inside; delete in place
+            await asyncio.to_thread(shutil.rmtree, cache_dir)
+        else:
+            trash_dirs.append(trash)
+        if trash_dirs:
+            remove_trash_later(trash_dirs)
         cache_dir.mkdir(parents=True, exist_ok=True)
 
         # Also create the required subdirectories
@@ -205,7 +291,7 @@ async def clear_cache(profile_name: str):
         print(f"[INFO] Cleared cache for profile: {profile_name}")
         server_logger.info(f"Cleared cache for profile: {profile_name}")
 
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "success": True,
             "message": f"Cache cleared successfully for profile '{profile_name}'"
         })
@@ -217,9 +303,10 @@ async def clear_cache(profile_name: str):
 async def delete_profile(profile_name: str):
     """Delete a profile and all its data."""
     try:
+        _drop_chroma(profile_name)
         remove_profile_op(profile_name)
         server_logger.info(f"Deleted profile: {profile_name}")
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "success": True,
             "message": f"Profile '{profile_name}' deleted successfully"
         })
@@ -229,11 +316,95 @@ async def delete_profile(profile_name: str):
         server_logger.error(f"Failed to delete profile {profile_name}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to delete profile: {str(e)}")
 
+# profile name -> (PersistentClient, "docs" collection), reused across requests
+_CHROMA_CLIENTS: dict[str, tuple] = {}
+_CHROMA_LOCK = threading.Lock()
+
+def _get_or_open_chroma(profile_name: str, chroma_dir: Path) -> tuple:
+    """Cached (client, collection) for a profile, opened on first use (blocking)."""
+    with _CHROMA_LOCK:
+        entry = _CHROMA_CLIENTS.get(profile_name)
+        if entry is None:
+            import chromadb
+            from chromadb.config import Settings
+
+            client = chromadb.PersistentClient(
+                path=str(chroma_dir),
+                settings=Settings(anonymized_telemetry=False)
+            )
+            entry = (client, client.get_collection(name="docs"))
+            _CHROMA_CLIENTS[profile_name] = entry
+        return entry
+
+def _drop_chroma(profile_name: str) -> None:
+    with _CHROMA_LOCK:
+        _CHROMA_CLIENTS.pop(profile_name, None)
+
+def _chroma_chunk_count(profile_name: str, chroma_dir: Path) -> int:
+    """Number of chunks in a profile's "docs" collection (blocking)."""
+    _, coll = _get_or_open_chroma(profile_name, chroma_dir)
+    try:
+        return coll.count()
+    except Exception:
+        # An ingest may have dropped and recreated the collection; reopen once
+        _drop_chroma(profile_name)
+        _, coll = _get_or_open_chroma(profile_name, chroma_dir)
+        return coll.count()
+
+# Directories holding at least this many files have their totals cached
+_DIR_SIZE_CACHE_MIN_FILES = 256
+# dir path -> (st_mtime_ns, bytes of files directly inside, subdirectory paths)
+_DIR_SIZE_CACHE: dict[str, tuple[int, int, list[str]]] = {}
+
+def _dir_size(path: Path) -> int:
+    """
+    Total size in bytes of all files under path (blocking).
+
+    Large directories (the crawl page caches) are re-read only when their
+    mtime changes, which happens whenever a file is added, removed or
+    replaced by rename. Small directories are always re-read, since files
+    like SQLite databases grow in place without touching the mtime.
+    """
+    total = 0
+    stack = [str(path)]
+    while stack:
+        d = stack.pop()
+        try:
+            mtime = os.stat(d).st_mtime_ns
+        except OSError:
+            continue
+        cached = _DIR_SIZE_CACHE.get(d)
+        if cached is not None and cached[0] == mtime:
+            total += cached[1]
+            stack.extend(cached[2])
+            continue
+
+        size, files, subdirs = 0, 0, []
+        try:
+            with os.scandir(d) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.is_file():
+                            size += entry.stat().st_size
+                            files += 1
+                    except OSError:
+                        pass
+        except OSError:
+            continue
+        if files >= _DIR_SIZE_CACHE_MIN_FILES:
+            _DIR_SIZE_CACHE[d] = (mtime, size, subdirs)
+        else:
+            _DIR_SIZE_CACHE.pop(d, None)
+        total += size
+        stack.extend(subdirs)
+    return total
+
 @app.get("/profile/{profile_name}/stats")
 async def get_profile_stats(profile_name: str):
     """Get statistics for a specific profile."""
     from pathlib import Path
-    import json
 
     try:
         # Check if profile exists
@@ -255,8 +426,8 @@ async def get_profile_stats(profile_name: str):
         metadata_file = profile_dir / "cache" / "metadata" / "ingestion_metadata.json"
         if metadata_file.exists():
             try:
-                with open(metadata_file, 'r') as f:
-                    metadata = json.load(f)
+                with open(metadata_file, 'rb') as f:
+                    metadata = orjson.loads(f.read())
                     stats["lastIngestion"] = metadata.get("last_ingestion")
                     stats["totalDocuments"] = metadata.get("total_documents", 0)
             except:
@@ -266,18 +437,8 @@ async def get_profile_stats(profile_name: str):
         try:
             chroma_dir = profile_dir / "data" / "chroma"
             if chroma_dir.exists():
-                # This is a rough estimate - actual implementation would query ChromaDB
-                import chromadb
-                from chromadb.config import Settings
-
-                client = chromadb.PersistentClient(
-                    path=str(chroma_dir),
-                    settings=Settings(anonymized_telemetry=False)
-                )
-
                 try:
-                    collection = client.get_collection(name="docs")
-                    count = collection.count()
+                    count = await asyncio.to_thread(_chroma_chunk_count, profile_name, chroma_dir)
                     stats["totalChunks"] = count
 
                     # Get category distribution if available
@@ -288,6 +449,8 @@ async def get_profile_stats(profile_name: str):
                             "api_reference": int(count * 0.25),
                             "guide": int(count * 0.18)
                         }
+                except ImportError:
+                    raise
                 except Exception as e:
                     server_logger.debug(f"Could not get collection stats: {e}")
                     # Use placeholder values if collection doesn't exist yet
@@ -297,24 +460,21 @@ async def get_profile_stats(profile_name: str):
         except ImportError:
             server_logger.debug("ChromaDB not available for stats")
 
-        # Calculate cache size
+        # Calculate cache and data sizes off the event loop
         cache_dir = profile_dir / "cache"
         if cache_dir.exists():
-            cache_size = sum(f.stat().st_size for f in cache_dir.rglob('*') if f.is_file())
-            stats["cacheSize"] = cache_size
+            stats["cacheSize"] = await asyncio.to_thread(_dir_size, cache_dir)
 
-        # Calculate data size
         data_dir = profile_dir / "data"
         if data_dir.exists():
-            data_size = sum(f.stat().st_size for f in data_dir.rglob('*') if f.is_file())
-            stats["dataSize"] = data_size
+            stats["dataSize"] = await asyncio.to_thread(_dir_size, data_dir)
 
-        return JSONResponse(content=stats)
+        return ORJSONResponse(content=stats)
 
     except Exception as e:
         server_logger.error(f"Failed to get stats for {profile_name}: {str(e)}")
         # Return default stats rather than error
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "profile": profile_name,
             "totalDocuments": 0,
             "totalChunks": 0,
@@ -335,7 +495,7 @@ async def switch_profile(profile_name: str):
         global_cfg = cfg
         global_profile = profile_name
 
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "success": True,
             "profile": profile_name,
             "message": f"Switched to profile '{profile_name}'"
@@ -343,8 +503,56 @@ async def switch_profile(profile_name: str):
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to switch profile: {str(e)}")
 
+NO_DOCS_ANSWER = "No relevant documentation found for your question. The database might be empty or need to be populated with 'python -m docsai.main ingest stripe'"
+NO_ANSWER = "Unable to generate an answer. Please check if the LLM is properly configured."
+NOT_INITIALIZED = "Server not initialized. Please start with 'python -m docsai.main serve <profile>'"
+
+def _gather_passages(search_results) -> tuple[list[str], list[str]]:
+    """Top passages and their unique source URLs (citation candidates)."""
+    passages = []
+    cite_urls: dict[str, None] = {}  # unique URLs in first-seen order
+
+    for result in search_results[:12]:  # Limit to top 12 passages
+        if len(result) == 3:
+            doc_id, passage, metadata = result
+        else:
+            doc_id, passage = result
+            metadata = {}
+
+        passages.append(passage)
+
+        # Get URL from metadata if available
+        if metadata and 'source_url' in metadata:
+            cite_urls.setdefault(metadata['source_url'], None)
+
+    return passages, list(cite_urls)
+
+def _answer_citations(answer: str, cite_urls: list[str]) -> list[str]:
+    """Map the [n] citations in an answer to the URLs they reference."""
+    # If the answer indicates nothing was found, don't return citations
+    if "not found in the provided documentation" in answer.lower():
+        server_logger.debug("Answer is 'not found', clearing citations")
+        return []
+
+    # Extract any citation numbers from the answer (e.g., [1], [2])
+    # and map them to actual URLs
+    citations_in_answer = CITATION_RE.findall(answer)
+
+    if citations_in_answer:
+        # Only include URLs that are actually referenced in the answer,
+        # in order of first reference (0-based index = number - 1)
+        cite_urls = list(dict.fromkeys(
+            cite_urls[idx] for idx in (int(n) - 1 for n in citations_in_answer)
+            if 0 <= idx < len(cite_urls)
+        ))
+        server_logger.debug(f"Found citations in answer: {citations_in_answer}, mapped to {len(cite_urls)} URLs")
+    return cite_urls
+
+def _sse(event: dict) -> str:
+    return f"data: {orjson.dumps(event).decode()}\n\n"
+
 @app.get("/ask", response_model=AskResponse)
-def ask_http(
+async def ask_http(
     q: str = Query(..., description="User question"),
     mode: str = Query(None, description="Prompt mode: comprehensive, integration, debugging, or learning"),
     supercharged: bool = Query(True, description="Use supercharged prompts for comprehensive answers")
@@ -354,12 +562,12 @@ def ask_http(
         # Check if config is loaded
         if global_cfg is None or global_profile is None:
             server_logger.error("Config not loaded - global_cfg or global_profile is None")
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=500,
                 content={
                     "answer": "",
                     "citations": [],
-                    "error": "Server not initialized. Please start with 'python -m docsai.main serve <profile>'"
+                    "error": NOT_INITIALIZED
                 },
             )
 
@@ -370,7 +578,9 @@ def ask_http(
         paths = profile_paths(global_profile)
         server_logger.debug(f"Paths: {paths}")
 
-        search_results = search_docs(global_cfg, paths, q)
+        # Search and generation block on disk, model and network I/O; run
+        # them in worker threads so the event loop keeps serving requests
+        search_results = await asyncio.to_thread(search_docs, global_cfg, paths, q)
         server_logger.debug(f"Found {len(search_results)} search results")
 
         # Debug: print first result structure
@@ -379,36 +589,16 @@ def ask_http(
             if len(search_results[0]) >= 3:
                 server_logger.debug(f"First result metadata: {search_results[0][2]}")
 
-        # Extract passages and URLs from metadata
-        passages = []
-        cite_urls = []
-        seen_urls = set()  # Track unique URLs
-
-        for result in search_results[:12]:  # Limit to top 12 passages
-            if len(result) == 3:
-                doc_id, passage, metadata = result
-            else:
-                doc_id, passage = result
-                metadata = {}
-
-            passages.append(passage)
-
-            # Get URL from metadata if available
-            if metadata and 'source_url' in metadata:
-                url = metadata['source_url']
-                if url not in seen_urls:
-                    cite_urls.append(url)
-                    seen_urls.add(url)
-                    server_logger.debug(f"Added citation: {url}")
+        passages, cite_urls = _gather_passages(search_results)
 
         server_logger.debug(f"Extracted {len(passages)} passages")
         server_logger.debug(f"Final citations list: {cite_urls}")
 
         if not passages:
             # No passages found, return a helpful message
-            return JSONResponse(
+            return ORJSONResponse(
                 content={
-                    "answer": "No relevant documentation found for your question. The database might be empty or need to be populated with 'python -m docsai.main ingest stripe'",
+                    "answer": NO_DOCS_ANSWER,
                     "citations": []
                 },
                 media_type="application/json",
@@ -422,36 +612,13 @@ def ask_http(
             server_logger.debug(f"Auto-detected prompt mode: {mode}")
 
         # Pass supercharged and mode parameters
-        text = run_llm(global_cfg, q, passages, supercharged=supercharged, prompt_mode=mode)
+        text = await _run_llm_shared(q, passages, supercharged, mode)
 
         # Normalize output
-        answer = (text or "").strip()
-        if not answer:
-            answer = "Unable to generate an answer. Please check if the LLM is properly configured."
-
-        # If the answer indicates nothing was found, don't return citations
-        if "not found in the provided documentation" in answer.lower():
-            cite_urls = []
-            server_logger.debug("Answer is 'not found', clearing citations")
-
-        # Extract any citation numbers from the answer (e.g., [1], [2])
-        # and map them to actual URLs
-        import re
-        citation_pattern = r'\[(\d+)\]'
-        citations_in_answer = re.findall(citation_pattern, answer)
-
-        if citations_in_answer:
-            # Only include URLs that are actually referenced in the answer
-            referenced_urls = []
-            for cite_num in citations_in_answer:
-                idx = int(cite_num) - 1  # Convert to 0-based index
-                if 0 <= idx < len(cite_urls):
-                    if cite_urls[idx] not in referenced_urls:
-                        referenced_urls.append(cite_urls[idx])
-            cite_urls = referenced_urls
-            server_logger.debug(f"Found citations in answer: {citations_in_answer}, mapped to {len(cite_urls)} URLs")
-
-        return JSONResponse(
+        answer = (text or "").strip() or NO_ANSWER
+        cite_urls = _answer_citations(answer, cite_urls)
+
+        return ORJSONResponse(
             content={"answer": answer, "citations": cite_urls},
             media_type="application/json",
         )
@@ -459,7 +626,7 @@ def ask_http(
         server_logger.error(f"Exception in /ask endpoint: {str(e)}")
         server_logger.error(f"Traceback: {traceback.format_exc()}")
         # Make failure visible to the UI instead of silent
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500,
             content={
                 "answer": "",
@@ -468,6 +635,62 @@ def ask_http(
             },
         )
 
+@app.get("/ask/stream")
+async def ask_stream(
+    q: str = Query(..., description="User question"),
+    mode: str = Query(None, description="Prompt mode: comprehensive, integration, debugging, or learning"),
+    supercharged: bool = Query(True, description="Use supercharged prompts for comprehensive answers")
+):
+    """
+    Like /ask, but streams the answer as Server-Sent Events: one
+    {"delta": ...} event per generated fragment, then a final
+    {"done": true, "answer": ..., "citations": [...]} event.
+    """
+    server_logger.info(f"Received /ask/stream request with query: {q}")
+    if global_cfg is None or global_profile is None:
+        server_logger.error("Config not loaded - global_cfg or global_profile is None")
+        return ORJSONResponse(
+            status_code=500,
+            content={"answer": "", "citations": [], "error": NOT_INITIALIZED},
+        )
+
+    cfg = global_cfg
+    try:
+        paths = profile_paths(global_profile)
+        search_results = await asyncio.to_thread(search_docs, cfg, paths, q)
+    except Exception as e:
+        server_logger.error(f"Exception in /ask/stream search: {str(e)}")
+        return ORJSONResponse(status_code=500, content={"answer": "", "citations": [], "error": str(e)})
+
+    passages, cite_urls = _gather_passages(search_results)
+    if mode is None and supercharged:
+        mode = detect_prompt_mode(q)
+
+    # A sync generator: StreamingResponse iterates it in a worker thread,
+    # so the blocking LLM stream never runs on the event loop
+    def events():
+        if not passages:
+            yield _sse({"done": True, "answer": NO_DOCS_ANSWER, "citations": []})
+            return
+
+        parts = []
+        try:
+            for delta in stream_llm(cfg, q, passages, supercharged=supercharged, prompt_mode=mode):
+                if delta:
+                    parts.append(delta)
+                    yield _sse({"delta": delta})
+        except Exception as e:
+            server_logger.error(f"Exception in /ask/stream generation: {str(e)}")
+            yield _sse({"done": True, "error": str(e)})
+            return
+
+        # Same preamble cleanup /ask applies, so both endpoints cite the same text
+        answer = clean_answer("".join(parts), supercharged) or NO_ANSWER
+        yield _sse({"done": True, "answer": answer, "citations": _answer_citations(answer, cite_urls)})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
 @cli.command()
 def serve(profile: str = typer.Argument(..., help="Profile name (e.g. stripe)")):
     global global_cfg, global_profile
@@ -600,18 +823,27 @@ def list_cmd():
     table.add_column("Cache", justify="right")
     table.add_column("Description")
 
-    for name in names:
+    def _summary(name):
         try:
-            s = get_profile_summary(name)
-            table.add_row(
-                s["name"],
-                s["source_type"],
-                f"{s['chunk_count']:,}",
-                human_size(s["cache_size"]),
-                (s["description"][:50] + "...") if len(s["description"]) > 50 else s["description"],
-            )
+            return get_profile_summary(name)
         except Exception as e:
-            table.add_row(name, "[red]error[/red]", "-", "-", str(e)[:50])
+            return e
+
+    # Summaries are I/O bound (Chroma open + cache walk); load them in parallel
+    with ThreadPoolExecutor(max_workers=min(8, len(names))) as ex:
+        summaries = list(ex.map(_summary, names))
+
+    for name, s in zip(names, summaries):
+        if isinstance(s, Exception):
+            table.add_row(name, "[red]error[/red]", "-", "-", str(s)[:50])
+            continue
+        table.add_row(
+            s["name"],
+            s["source_type"],
+            f"{s['chunk_count']:,}",
+            human_size(s["cache_size"]),
+            (s["description"][:50] + "...") if len(s["description"]) > 50 else s["description"],
+        )
 
     console.print(table)
 
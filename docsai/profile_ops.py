@@ -310,6 +310,7 @@ def remove_profile(name: str) -> None:
         pass
 
     shutil.rmtree(profile_dir, ignore_errors=False)
+    profile_paths.cache_clear()
 
 
 # ---------------------------------------------------------------------------
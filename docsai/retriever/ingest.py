@@ -1,7 +1,7 @@
 # --- top of file ---
 from bs4 import BeautifulSoup
 import hashlib, re, orjson, requests, markdownify
-import time
+import os, threading, time
 from urllib.parse import urljoin, urlparse
 import urllib.robotparser as robotparser
 from pathlib import Path
@@ -51,6 +51,7 @@ def _chunk(md: str, tok=800, overlap=120) -> List[str]:
         i += step
     return out
 _robots_cache: dict[str, robotparser.RobotFileParser | None] = {}
+_robots_lock = threading.Lock()  # parallel crawls share the cache
 
 def _robots_allowed(start_domain: str, url: str, respect: bool) -> bool:
     if not respect:
@@ -58,23 +59,24 @@ def _robots_allowed(start_domain: str, url: str, respect: bool) -> bool:
     parsed = urlparse(start_domain)
     domain_key = f"{parsed.scheme}://{parsed.netloc}"
 
-    if domain_key not in _robots_cache:
-        robots_url = f"{domain_key}/robots.txt"
-        print(f"[ROBOTS] Fetching {robots_url}")
-        try:
-            r = requests.get(robots_url, headers=HEADERS, timeout=10)
-            if r.status_code == 200 and "text/html" not in r.headers.get("Content-Type", ""):
-                rp = robotparser.RobotFileParser()
-                rp.parse(r.text.splitlines())
-                _robots_cache[domain_key] = rp
-                print(f"[ROBOTS] Parsed robots.txt for {domain_key}")
-            else:
-                # 403/404/HTML response — no valid robots.txt, allow all
+    with _robots_lock:
+        if domain_key not in _robots_cache:
+            robots_url = f"{domain_key}/robots.txt"
+            print(f"[ROBOTS] Fetching {robots_url}")
+            try:
+                r = requests.get(robots_url, headers=HEADERS, timeout=10)
+                if r.status_code == 200 and "text/html" not in r.headers.get("Content-Type", ""):
+                    rp = robotparser.RobotFileParser()
+                    rp.parse(r.text.splitlines())
+                    _robots_cache[domain_key] = rp
+                    print(f"[ROBOTS] Parsed robots.txt for {domain_key}")
+                else:
+                    # 403/404/HTML response — no valid robots.txt, allow all
+                    _robots_cache[domain_key] = None
+                    print(f"[ROBOTS] No valid robots.txt for {domain_key} (status={r.status_code}), allowing all")
+            except Exception as e:
                 _robots_cache[domain_key] = None
-                print(f"[ROBOTS] No valid robots.txt for {domain_key} (status={r.status_code}), allowing all")
-        except Exception as e:
-            _robots_cache[domain_key] = None
-            print(f"[ROBOTS] Error fetching robots.txt for {domain_key}: {e}, allowing all")
+                print(f"[ROBOTS] Error fetching robots.txt for {domain_key}: {e}, allowing all")
 
     rp = _robots_cache[domain_key]
     if rp is None:
@@ -115,11 +117,69 @@ def _write_cache(cache_dir: Path, url: str, html: str) -> None:
     h = hashlib.sha1(url.encode("utf-8")).hexdigest() + ".html"
     p = cache_dir / h
     p.parent.mkdir(parents=True, exist_ok=True)
+    # Write then rename, so a crawl running in another thread never reads
+    # a half-written page
+    tmp = p.with_name(f"{h}.{threading.get_ident()}.tmp")
     try:
-        p.write_text(html, encoding="utf-8")
+        tmp.write_text(html, encoding="utf-8")
+        os.replace(tmp, p)
     except Exception:
         pass
 
+# Crawls of several allowed paths run in parallel threads and share these:
+# a URL being fetched by one crawl is waited for (then read from the page
+# cache) by the others, and requests to a host start CRAWL_DELAY apart
+CRAWL_DELAY = 0.3
+_fetch_lock = threading.Lock()
+_inflight: dict[str, threading.Event] = {}
+_host_next_fetch: dict[str, float] = {}
+
+def _wait_for_host(host: str) -> None:
+    with _fetch_lock:
+        now = time.monotonic()
+        start = max(now, _host_next_fetch.get(host, 0.0))
+        _host_next_fetch[host] = start + CRAWL_DELAY
+    if start > now:
+        time.sleep(start - now)
+
+def _fetch_page(cache_dir: Path, url: str) -> str | None:
+    """Fetch and cache one page; None if it was skipped or failed."""
+    with _fetch_lock:
+        pending = _inflight.get(url)
+        owner = pending is None
+        if owner:
+            pending = _inflight[url] = threading.Event()
+    if not owner:
+        print(f"[CRAWL] Waiting for in-flight fetch of {url}")
+        pending.wait()
+        return _read_cache(cache_dir, url)
+
+    try:
+        # Another crawl may have finished this page since our cache miss
+        html = _read_cache(cache_dir, url)
+        if html is not None:
+            return html
+        print(f"[CRAWL] Fetching {url} (not in cache)")
+        # be courteous
+        _wait_for_host(urlparse(url).netloc)
+        try:
+            r = requests.get(url, headers=HEADERS, timeout=20)
+            print(f"[CRAWL] Response status: {r.status_code}, Content-Type: {r.headers.get('Content-Type', 'unknown')}")
+            if r.status_code != 200 or "text/html" not in (r.headers.get("Content-Type","")):
+                print(f"[CRAWL] Skipping {url} - bad status or not HTML")
+                return None
+            html = r.text
+            _write_cache(cache_dir, url, html)
+            print(f"[CRAWL] Cached {url}")
+            return html
+        except Exception as e:
+            print(f"[CRAWL] Error fetching {url}: {e}")
+            return None
+    finally:
+        with _fetch_lock:
+            del _inflight[url]
+        pending.set()
+
 def crawl_website(start_url: str, allowed_paths: list[str], max_depth: int, cache_dir: Path, on_page=None) -> dict[str, str]:
     """
     Tiny, respectful BFS crawler with caching.
@@ -161,20 +221,8 @@ def crawl_website(start_url: str, allowed_paths: list[str], max_depth: int, cach
         # load cached or fetch
         html = _read_cache(cache_dir, url)
         if html is None:
-            print(f"[CRAWL] Fetching {url} (not in cache)")
-            try:
-                r = requests.get(url, headers=HEADERS, timeout=20)
-                print(f"[CRAWL] Response status: {r.status_code}, Content-Type: {r.headers.get('Content-Type', 'unknown')}")
-                if r.status_code != 200 or "text/html" not in (r.headers.get("Content-Type","")):
-                    print(f"[CRAWL] Skipping {url} - bad status or not HTML")
-                    continue
-                html = r.text
-                _write_cache(cache_dir, url, html)
-                print(f"[CRAWL] Cached {url}")
-                # be courteous
-                time.sleep(0.3)
-            except Exception as e:
-                print(f"[CRAWL] Error fetching {url}: {e}")
+            html = _fetch_page(cache_dir, url)
+            if html is None:
                 continue
         else:
             print(f"[CRAWL] Using cached version of {url}")
@@ -260,7 +308,7 @@ def ingest_profile(profile_name: str, cfg: Dict, paths: Dict):
         print(f"[INGEST] Processing local directories: {local_paths}")
         print(f"[INGEST] File types: {file_types}")
 
-        parser = FileParser()
+        parser = FileParser(cache_dir=paths["cache"] / "parsed")
 
         for local_path in local_paths:
             path = Path(local_path)
@@ -1,23 +1,46 @@
+from functools import lru_cache
 from typing import List, Tuple, Dict
-import chromadb
-from chromadb.config import Settings
-from rank_bm25 import BM25Okapi
-from sentence_transformers import SentenceTransformer
 import numpy as np
 
+# chromadb, rank_bm25 and sentence_transformers (with torch) are imported on
+# first use: the server module imports this one, and spawned ingest workers
+# re-import the server module without ever searching
+
+@lru_cache(maxsize=4)
+def _get_embedder(model_name: str):
+    """Load each embedding model once per process instead of once per query."""
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+def _top_k(scores: np.ndarray, k: int) -> List[int]:
+    """Indices of the k highest scores, best first; ties go to the higher index."""
+    if k <= 0:
+        return []
+    # Stable ascending sort reversed, so tied scores (common for BM25 zeros)
+    # select the same documents as the original argsort()[::-1]
+    return list(np.argsort(scores, kind="stable")[::-1][:k])
+
 def _bm25_rank(query: str, corpus: List[str], top_k: int) -> List[int]:
+    from rank_bm25 import BM25Okapi
     tokenized_corpus = [c.split() for c in corpus]
     bm25 = BM25Okapi(tokenized_corpus)
     scores = bm25.get_scores(query.split())
-    return list(np.argsort(scores)[::-1][:top_k])
+    return _top_k(scores, top_k)
 
-def _top_k_embed(query: str, corpus: List[str], top_k: int, embedder) -> List[int]:
+def _top_k_embed(query: str, corpus: List[str], top_k: int, embedder, stored=None) -> List[int]:
     qv = embedder.encode([query], normalize_embeddings=True)[0]
-    D = embedder.encode(corpus, normalize_embeddings=True)
+    if stored is not None:
+        # Vectors Chroma already holds for these chunks; normalize instead of re-encoding
+        D = np.asarray(stored, dtype=np.float32)
+        D = D / np.clip(np.linalg.norm(D, axis=1, keepdims=True), 1e-12, None)
+    else:
+        D = embedder.encode(corpus, normalize_embeddings=True)
     sims = (D @ qv)
-    return list(np.argsort(sims)[::-1][:top_k])
+    return _top_k(sims, top_k)
 
 def search(cfg: Dict, paths: Dict, question: str) -> List[Tuple[str, str, Dict]]:
+    import chromadb
+    from chromadb.config import Settings
     client = chromadb.Client(Settings(is_persistent=True, persist_directory=str(paths["chroma"])))
     coll = client.get_or_create_collection("docs")
 
@@ -29,7 +52,12 @@ def search(cfg: Dict, paths: Dict, question: str) -> List[Tuple[str, str, Dict]]
 
     # Get documents with metadata
     # ChromaDB's get() without IDs returns all documents
-    res = coll.get(limit=min(200, count))
+    # Stored vectors are only comparable with the query vector when the
+    # collection records that this exact model (and backend) produced them
+    model_name = cfg["model"]["embedding"]["hf_name"]
+    reuse_stored = (coll.metadata or {}).get("model") == model_name
+    include = ["documents", "metadatas"] + (["embeddings"] if reuse_stored else [])
+    res = coll.get(limit=min(200, count), include=include)
     docs = res.get("documents") or []
     ids = res.get("ids") or []
     metadatas = res.get("metadatas") or []
@@ -41,9 +69,12 @@ def search(cfg: Dict, paths: Dict, question: str) -> List[Tuple[str, str, Dict]]
     k_embed = cfg["retrieval"]["k_embed"]
     combine_top_k = cfg["retrieval"]["combine_top_k"]
 
-    embedder = SentenceTransformer(cfg["model"]["embedding"]["hf_name"])
+    embedder = _get_embedder(model_name)
+    stored = res.get("embeddings") if reuse_stored else None
+    if stored is None or len(stored) != len(docs) or embedder.get_sentence_embedding_dimension() != len(stored[0]):
+        stored = None
     bm_idx = _bm25_rank(question, docs, min(k_bm25, len(docs)))
-    em_idx = _top_k_embed(question, docs, min(k_embed, len(docs)), embedder)
+    em_idx = _top_k_embed(question, docs, min(k_embed, len(docs)), embedder, stored)
 
     merged = list(dict.fromkeys(bm_idx + em_idx))[:combine_top_k]
     out = [(ids[i], docs[i], metadatas[i] if i < len(metadatas) else {}) for i in merged]